@@ -0,0 +1,182 @@
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, abort, g, request
+from sqlalchemy import select
+
+from models import db, Venue, Artist, ShowStats, DEFAULT_SHOW_MINUTES, MAX_SHOW_MINUTES
+from queries import (stats_of, num_upcoming_shows, shows_query, show_tile, venue_detail,
+                     artist_detail, conflicts_query, venues_near, available_query, VENUE_ORDER, ARTIST_ORDER,
+                     SHOW_ORDER)
+from pagination import paginate
+from cache import response_cache
+from routing import use_replica
+import geo
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+# Read-only views of the same queries the pages use. Responses carry an
+# ETag/Last-Modified derived from the page-cache tags, so a client
+# revalidating an unchanged resource gets a 304 without a database query.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+api.before_request(use_replica)
+
+
+def _default(value):
+    # ISO 8601, as orjson writes datetimes.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), default=_default)
+
+
+def select_fields(item):
+    # ?fields=id,name trims every object to the listed keys.
+    fields = request.args.get('fields')
+    if not fields:
+        return item
+    wanted = fields.split(',')
+    return {key: item[key] for key in wanted if key in item}
+
+
+def json_response(payload):
+    return Response(dumps(payload), mimetype='application/json')
+
+
+def page_response(items, next_cursor):
+    return json_response({
+        "data": [select_fields(item) for item in items],
+        "next_cursor": next_cursor,
+    })
+
+
+@api.route('/venues')
+@response_cache.conditional('venues')
+@response_cache.cached('venues')
+def venues():
+    stmt = select(Venue.id, Venue.name, Venue.city, Venue.state, num_upcoming_shows()
+                  ).outerjoin(ShowStats, stats_of(Venue))
+    rows, next_cursor = paginate(stmt, VENUE_ORDER)
+    return page_response([dict(row._mapping) for row in rows], next_cursor)
+
+
+@api.route('/venues/nearby')
+def nearby_venues():
+    # ?lat=&lon=&radius=&limit= -> the nearest venues, with their distance.
+    latitude, longitude, radius, limit = geo.nearby_args()
+    return json_response({
+        "data": [select_fields(dict(row._mapping, distance_km=distance))
+                 for distance, row in venues_near(latitude, longitude, radius, limit)],
+    })
+
+
+@api.route('/venues/<int:venue_id>')
+@response_cache.conditional('venue:{venue_id}')
+@response_cache.cached('venue:{venue_id}')
+def venue(venue_id):
+    data, next_show_at = venue_detail(venue_id, datetime.now())
+    if data is None:
+        abort(404)
+    response_cache.expire_at(next_show_at)
+    return json_response(select_fields(data))
+
+
+@api.route('/artists')
+@response_cache.conditional('artists')
+@response_cache.cached('artists')
+def artists():
+    stmt = select(Artist.id, Artist.name, Artist.city, Artist.state, num_upcoming_shows()
+                  ).outerjoin(ShowStats, stats_of(Artist))
+    rows, next_cursor = paginate(stmt, ARTIST_ORDER)
+    return page_response([dict(row._mapping) for row in rows], next_cursor)
+
+
+@api.route('/artists/<int:artist_id>')
+@response_cache.conditional('artist:{artist_id}')
+@response_cache.cached('artist:{artist_id}')
+def artist(artist_id):
+    data, next_show_at = artist_detail(artist_id, datetime.now())
+    if data is None:
+        abort(404)
+    response_cache.expire_at(next_show_at)
+    return json_response(select_fields(data))
+
+
+@api.route('/shows')
+@response_cache.conditional('shows')
+@response_cache.cached('shows')
+def shows():
+    rows, next_cursor = paginate(shows_query(), SHOW_ORDER)
+    return page_response([show_tile(row) for row in rows], next_cursor)
+
+
+def window():
+    # ?date=YYYY-MM-DD for a whole day, or ?start=&end= (ISO 8601).
+    try:
+        if 'date' in request.args:
+            start = datetime.fromisoformat(request.args['date'])
+            return start, start + timedelta(days=1)
+        start = datetime.fromisoformat(request.args.get('start', ''))
+        end = datetime.fromisoformat(request.args.get('end', ''))
+    except ValueError:
+        abort(400)
+    if end <= start:
+        abort(400)
+    return start, end
+
+
+@api.route('/venues/available')
+@response_cache.conditional('venues', 'shows')
+@response_cache.cached('venues', 'shows')
+def available_venues():
+    # venues looking for talent with nothing booked in the window;
+    # ?genre= narrows them to one genre.
+    start, end = window()
+    rows, next_cursor = paginate(available_query(Venue, start, end, request.args.get('genre')), VENUE_ORDER)
+    return page_response([dict(row._mapping) for row in rows], next_cursor)
+
+
+@api.route('/artists/available')
+@response_cache.conditional('artists', 'shows')
+@response_cache.cached('artists', 'shows')
+def available_artists():
+    start, end = window()
+    rows, next_cursor = paginate(available_query(Artist, start, end, request.args.get('genre')), ARTIST_ORDER)
+    return page_response([dict(row._mapping) for row in rows], next_cursor)
+
+
+@api.route('/availability')
+def availability():
+    # ?venue_id=&artist_id=&start_time=&duration= -> whether that booking
+    # is free, and the shows in the way if not; one query.
+    venue_id = request.args.get('venue_id', type=int)
+    artist_id = request.args.get('artist_id', type=int)
+    duration = request.args.get('duration', DEFAULT_SHOW_MINUTES, type=int)
+    try:
+        start = datetime.fromisoformat(request.args.get('start_time', ''))
+    except ValueError:
+        abort(400)
+    if (venue_id is None and artist_id is None) or not 0 < duration <= MAX_SHOW_MINUTES:
+        abort(400)
+
+    # answered from the primary: a replica could miss a booking just made.
+    g.use_replica = False
+    end = start + timedelta(minutes=duration)
+    rows = db.session.execute(conflicts_query(venue_id, artist_id, start, end)).all()
+    return json_response({
+        "available": not rows,
+        "conflicts": [dict(row._mapping) for row in rows],
+    })
@@ -0,0 +1,210 @@
+import traceback
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+from sqlalchemy import select
+
+from forms import ArtistForm
+from models import db, Artist, genres_by_name
+from queries import in_genre, artist_detail, calendar_query, ARTIST_ORDER
+from pagination import paginate
+from search import search
+from cache import response_cache
+from routing import read_only
+from invalidation import artist_changed
+import ical
+import ratelimit
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+artists = Blueprint('artists', __name__)
+
+
+@artists.route('/artists')
+@read_only
+@response_cache.cached('artists')
+def index():
+    # TODO: replace with real data returned from querying the database
+    artists, next_cursor = paginate(select(Artist.id, Artist.name), ARTIST_ORDER)
+    data = [{
+        "id": artist.id,
+        "name": artist.name,
+    } for artist in artists]
+
+    return render_template('pages/artists.html', artists=data, next_cursor=next_cursor)
+
+
+@artists.route('/artists/genres/<genre>')
+@read_only
+@response_cache.cached('artists')
+def artists_by_genre(genre):
+    stmt = in_genre(select(Artist.id, Artist.name), Artist, genre)
+    artists, next_cursor = paginate(stmt, ARTIST_ORDER)
+    data = [{
+        "id": artist.id,
+        "name": artist.name,
+    } for artist in artists]
+
+    return render_template('pages/artists.html', artists=data, next_cursor=next_cursor, genre=genre)
+
+
+@artists.route('/artists/search', methods=['POST'])
+@read_only
+@ratelimit.limit('search')
+def search_artists():
+    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+
+    search_term = request.form.get('search_term', '')
+    response = search(Artist, search_term)
+
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+
+@artists.route('/artists/<int:artist_id>')
+@read_only
+@response_cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    # TODO: replace with real artist data from the artist table, using artist_id
+
+    data, next_show_at = artist_detail(artist_id, datetime.now())
+    if data is None:
+        abort(404)
+    response_cache.expire_at(next_show_at)
+
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@artists.route('/artists/<int:artist_id>/calendar.ics')
+@read_only
+@response_cache.conditional('artist:{artist_id}')
+@response_cache.cached('artist:{artist_id}')
+def artist_calendar(artist_id):
+    # subscribed feeds are polled. With a shared cache a poll that
+    # revalidates gets a 304 straight from the tag versions and only a
+    # changed feed is rebuilt; in process, feeds aren't kept (keep_for).
+    artist = db.session.get(Artist, artist_id)
+    if artist is None:
+        abort(404)
+    since = datetime.now() - timedelta(days=current_app.config['CALENDAR_PAST_DAYS'])
+    rows = db.session.execute(calendar_query(Artist, artist_id, since)).all()
+    response_cache.keep_for(current_app.config['CALENDAR_CACHE_TTL'])
+    return ical.feed(artist.name, rows)
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@artists.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@artists.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+
+    form = ArtistForm(request.form)
+
+    try:
+        if form.validate():
+            artist = Artist(
+                name=form.name.data,
+                city=form.city.data,
+                state=form.state.data,
+                phone=form.phone.data,
+                genres=genres_by_name(form.genres.data),
+                facebook_link=form.facebook_link.data,
+                image_link=form.image_link.data,
+                website_link=form.website_link.data,
+                looking_for_venue=form.seeking_venue.data,
+                seeking_description=form.seeking_description.data
+            )
+            db.session.add(artist)
+            db.session.commit()
+            artist_changed(artist.id)
+
+    # on successful db insert, flash success
+        flash('Artist ' + request.form['name'] + ' was successfully listed!')
+
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    except:
+        db.session.rollback()
+        flash('An error occured. Artist ' +
+              request.form['name'] + ' could not be listed.')
+        traceback.print_exc()
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html', form=form)
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+
+    form = ArtistForm()
+
+    artists = Artist.query.filter_by(id=artist_id).all()
+
+    for artist in artists:
+        artist = {
+            "id": artist.id,
+            "name": artist.name,
+            "genres": [genre.name for genre in artist.genres],
+            "city": artist.city,
+            "state": artist.state,
+            "phone": artist.phone,
+            "website": artist.website_link,
+            "facebook_link": artist.facebook_link,
+            "seeking_venue": artist.looking_for_venue,
+            "seeking_description": artist.seeking_description,
+            "image_link": artist.image_link
+        }
+    # TODO: populate form with fields from artist with ID <artist_id>
+
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    # TODO: take values from the form submitted, and update existing
+    # artist record with ID <artist_id> using the new attributes
+
+    form = ArtistForm(request.form)
+    try:
+        artist = Artist.query.filter_by(id=artist_id).first()
+        artist.name = form.name.data
+        artist.city = form.city.data
+        artist.state = form.state.data
+        artist.phone = form.phone.data
+        artist.genres = genres_by_name(form.genres.data)
+        artist.facebook_link = form.facebook_link.data
+        artist.image_link = form.image_link.data
+        artist.website_link = form.website_link.data
+        artist.looking_for_venue = form.seeking_venue.data
+        artist.seeking_description = form.seeking_description.data
+
+        db.session.commit()
+        artist_changed(artist_id)
+
+    except Exception:
+        db.session.rollback()
+        flash('An error occured. Could not be updated.')
+
+    finally:
+        db.session.close()
+
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
@@ -0,0 +1,268 @@
+"""ASGI entry point.
+
+    uvicorn asgi:application --workers 4
+
+The read-only catalog pages (listings and venue/artist detail) run as
+coroutines on SQLAlchemy's async engine, with their independent queries
+issued concurrently; every other route is served by the regular Flask
+app through asgiref's WSGI adapter. Needs asgiref plus asyncpg (PostgreSQL)
+or aiosqlite (SQLite). create_app() keeps working unchanged under a WSGI
+server.
+"""
+import asyncio
+import io
+import sys
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import abort, g, render_template, request
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from models import Venue, Artist
+from queries import (venue_areas_query, group_areas, in_genre, shows_query, venue_shows_query,
+                     artist_shows_query, venue_data, artist_data,
+                     VENUE_ORDER, ARTIST_ORDER, SHOW_ORDER)
+from pagination import page_statement, page_rows
+from cache import response_cache
+from routing import REPLICA, use_replica
+
+app = create_app(migrations=False)
+
+#----------------------------------------------------------------------------#
+# Async engines.
+#----------------------------------------------------------------------------#
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_engine(url):
+    url = make_url(url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if 'connect_args' in options:
+        # asyncpg takes server settings, not a libpq options string.
+        options['connect_args'] = {'server_settings': {
+            'statement_timeout': str(app.config['DB_STATEMENT_TIMEOUT'])}}
+    return create_async_engine(url, **options)
+
+
+engines = {'primary': async_engine(app.config['SQLALCHEMY_DATABASE_URI'])}
+if (app.config.get('SQLALCHEMY_BINDS') or {}).get(REPLICA):
+    engines[REPLICA] = async_engine(app.config['SQLALCHEMY_BINDS'][REPLICA])
+
+
+def current_engine():
+    if g.get('use_replica') and REPLICA in engines:
+        return engines[REPLICA]
+    return engines['primary']
+
+
+async def fetch(stmt):
+    # one session, and so one connection, per call: calls gathered together
+    # run concurrently.
+    async with AsyncSession(current_engine()) as session:
+        return (await session.execute(stmt)).all()
+
+
+async def fetch_entity(model, id):
+    # the Venue/Artist with its genres loaded, usable after the session closes.
+    async with AsyncSession(current_engine()) as session:
+        return await session.get(model, id, options=[selectinload(model.genres)])
+
+
+async def dispose():
+    for engine in engines.values():
+        await engine.dispose()
+
+#----------------------------------------------------------------------------#
+# Async views.
+#----------------------------------------------------------------------------#
+
+# Same templates, cache tags and queries as the blueprint views.
+
+
+async def venue_areas(stmt, **context):
+    stmt, size = page_statement(stmt, VENUE_ORDER)
+    rows, next_cursor = page_rows(await fetch(stmt), VENUE_ORDER, size)
+    return render_template('pages/venues.html', areas=group_areas(rows), next_cursor=next_cursor, **context)
+
+
+@response_cache.cached('venues')
+async def venues():
+    return await venue_areas(venue_areas_query())
+
+
+@response_cache.cached('venues')
+async def venues_by_genre(genre):
+    return await venue_areas(in_genre(venue_areas_query(), Venue, genre), genre=genre)
+
+
+async def artist_list(stmt, **context):
+    stmt, size = page_statement(stmt, ARTIST_ORDER)
+    artists, next_cursor = page_rows(await fetch(stmt), ARTIST_ORDER, size)
+    data = [{
+        "id": artist.id,
+        "name": artist.name,
+    } for artist in artists]
+    return render_template('pages/artists.html', artists=data, next_cursor=next_cursor, **context)
+
+
+@response_cache.cached('artists')
+async def artists():
+    return await artist_list(select(Artist.id, Artist.name))
+
+
+@response_cache.cached('artists')
+async def artists_by_genre(genre):
+    return await artist_list(in_genre(select(Artist.id, Artist.name), Artist, genre), genre=genre)
+
+
+@response_cache.cached('shows')
+async def shows():
+    stmt, size = page_statement(shows_query(), SHOW_ORDER)
+    shows, next_cursor = page_rows(await fetch(stmt), SHOW_ORDER, size)
+    return render_template('pages/shows.html', shows=shows, next_cursor=next_cursor)
+
+
+@response_cache.cached('venue:{venue_id}')
+async def show_venue(venue_id):
+    now = datetime.now()
+    venue, shows = await asyncio.gather(fetch_entity(Venue, venue_id), fetch(venue_shows_query(venue_id)))
+    if venue is None:
+        abort(404)
+    data, next_show_at = venue_data(venue, shows, now)
+    response_cache.expire_at(next_show_at)
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@response_cache.cached('artist:{artist_id}')
+async def show_artist(artist_id):
+    now = datetime.now()
+    artist, shows = await asyncio.gather(fetch_entity(Artist, artist_id), fetch(artist_shows_query(artist_id)))
+    if artist is None:
+        abort(404)
+    data, next_show_at = artist_data(artist, shows, now)
+    response_cache.expire_at(next_show_at)
+    return render_template('pages/show_artist.html', artist=data)
+
+
+# Flask endpoint -> async view; these must all be read-only GET views.
+VIEWS = {
+    'venues.index': venues,
+    'venues.venues_by_genre': venues_by_genre,
+    'artists.index': artists,
+    'artists.artists_by_genre': artists_by_genre,
+    'shows.index': shows,
+    'venues.show_venue': show_venue,
+    'artists.show_artist': show_artist,
+}
+
+#----------------------------------------------------------------------------#
+# ASGI application.
+#----------------------------------------------------------------------------#
+
+wsgi = WsgiToAsgi(app)
+
+
+def environ_for(scope):
+    # enough of a WSGI environ for Flask to route, render and set headers.
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        value = value.decode('latin1')
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def async_view(environ):
+    try:
+        endpoint, view_args = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    return VIEWS.get(endpoint)
+
+
+async def dispatch(view, environ):
+    # Flask's wsgi_app/full_dispatch_request, awaiting the view. The request
+    # context lives in this task's contextvars, so requests interleaving on
+    # the event loop each see their own request, g and session.
+    ctx = app.request_context(environ)
+    error = None
+    try:
+        try:
+            ctx.push()
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    use_replica()
+                    rv = await view(**request.view_args)
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            return app.handle_exception(e)
+    finally:
+        ctx.pop(error)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+        return await wsgi(scope, receive, send)
+
+    environ = environ_for(scope)
+    view = async_view(environ)
+    if view is None:
+        return await wsgi(scope, receive, send)
+
+    response = await dispatch(view, environ)
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in response.headers.items()],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': b'' if scope['method'] == 'HEAD' else response.get_data(),
+    })
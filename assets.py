@@ -0,0 +1,235 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import Blueprint, Response, abort, current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+#----------------------------------------------------------------------------#
+# Static assets.
+#----------------------------------------------------------------------------#
+
+# `flask assets build` concatenates and minifies each bundle, writes it to
+# static/dist under a name that carries a hash of its contents, adds .gz
+# and .br (with the brotli package installed) variants, and records the
+# names in static/dist/manifest.json. Fingerprinted files never change, so
+# they are served with a one-year immutable Cache-Control. static/dist
+# isn't committed, so outside debug the app builds it at start when the
+# manifest is missing or older than a source (ASSETS_BUILD_ON_START).
+# Without a build, asset_url() points at an unminified, uncached bundle
+# assembled per request.
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# bundles keep dist/ one level under static/ so the url(../fonts/...)
+# references in the stylesheets still resolve.
+BUNDLES = {
+    'main.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # run before the page renders.
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # deferred; needs jQuery.
+    'main.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+# fingerprinted on their own rather than bundled.
+FILES = [
+    'js/libs/jquery-1.11.1.min.js',
+    'js/libs/respond-1.4.2.min.js',
+    'img/front-splash.jpg',
+]
+
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
+assets = Blueprint('assets', __name__)
+
+#  Build
+#  ----------------------------------------------------------------
+
+# strings are matched first so they pass through untouched; /*! license
+# comments are kept.
+_CSS_TOKENS = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(/\*(?!!).*?\*/)|\s*;?\s*(})\s*|\s*([{;,>])\s*|\s+""",
+                         re.DOTALL)
+_SOURCE_MAP = re.compile(r'^\s*//[#@] sourceMappingURL=.*$', re.MULTILINE)
+
+
+def minify_css(text):
+    def token(match):
+        string, comment, close, punctuation = match.groups()
+        if string:
+            return string
+        if comment:
+            return ''
+        return close or punctuation or ' '
+    return _CSS_TOKENS.sub(token, text).strip()
+
+
+def minify_js(text):
+    # a safe JS minifier needs a tokenizer; use rjsmin when it is installed
+    # and otherwise only drop what can't change meaning.
+    text = _SOURCE_MAP.sub('', text)
+    try:
+        import rjsmin
+    except ImportError:
+        lines = (line.strip() for line in text.splitlines())
+        return '\n'.join(line for line in lines if line and not line.startswith('//'))
+    return rjsmin.jsmin(text)
+
+
+def bundle(static_folder, name):
+    sources = []
+    for path in BUNDLES[name]:
+        with open(os.path.join(static_folder, path), encoding='utf8') as f:
+            sources.append(f.read())
+    if name.endswith('.css'):
+        return '\n'.join(sources)
+    # a file without a trailing semicolon must not run into the next one.
+    return ';\n'.join(sources)
+
+
+def fingerprinted(name, data):
+    stem, ext = os.path.splitext(os.path.basename(name))
+    return '{}.{}{}'.format(stem, hashlib.sha256(data).hexdigest()[:12], ext)
+
+
+def compress(path, data):
+    # the variants are only kept when they are smaller.
+    variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            write(path + suffix, compressed)
+
+
+def build(static_folder):
+    """Write every bundle and file to static/dist; returns the manifest."""
+    directory = os.path.join(static_folder, DIST)
+    os.makedirs(directory, exist_ok=True)
+    outputs = {}
+    for name in BUNDLES:
+        text = bundle(static_folder, name)
+        outputs[name] = (minify_css(text) if name.endswith('.css') else minify_js(text)).encode('utf8')
+    for name in FILES:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            outputs[name] = f.read()
+
+    manifest = {}
+    for name, data in outputs.items():
+        filename = fingerprinted(name, data)
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            # compressed variants first: once the file is there, it is done.
+            if filename.endswith(COMPRESSIBLE):
+                compress(path, data)
+            write(path, data)
+        manifest[name] = filename
+
+    write(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf8'))
+    return manifest
+
+
+def write(path, data):
+    # workers starting together may build at once; a reader sees either
+    # no file or a whole one.
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def stale(static_folder):
+    """Whether the manifest is missing or older than a source."""
+    try:
+        built = os.path.getmtime(os.path.join(static_folder, DIST, MANIFEST))
+    except OSError:
+        return True
+    sources = [path for paths in BUNDLES.values() for path in paths] + FILES
+    return any(os.path.getmtime(os.path.join(static_folder, path)) > built for path in sources)
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+#  Serving
+#  ----------------------------------------------------------------
+
+
+def asset_url(name):
+    """URL of a bundle from BUNDLES or a file from FILES; the
+    fingerprinted build when there is one."""
+    filename = current_app.extensions['assets'].get(name)
+    if filename is not None:
+        return url_for('assets.dist', filename=filename)
+    if name in BUNDLES:
+        return url_for('assets.source_bundle', name=name)
+    return url_for('static', filename=name)
+
+
+@assets.route('/static/dist/<path:filename>')
+def dist(filename):
+    directory = os.path.join(current_app.static_folder, DIST)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    compressible = filename.endswith(COMPRESSIBLE)
+    encoding = None
+    if compressible:
+        for name, suffix in (('br', '.br'), ('gzip', '.gz')):
+            path = safe_join(directory, filename + suffix)
+            if request.accept_encodings[name] and path and os.path.isfile(path):
+                encoding, filename = name, filename + suffix
+                break
+
+    response = send_from_directory(directory, filename, mimetype=mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+@assets.route('/assets/<name>')
+def source_bundle(name):
+    # development fallback when static/dist hasn't been built.
+    if name not in BUNDLES:
+        abort(404)
+    response = Response(bundle(current_app.static_folder, name), mimetype=mimetypes.guess_type(name)[0])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('ASSETS_BUILD_ON_START', True)
+    if app.config['ASSETS_BUILD_ON_START'] and not app.debug and stale(app.static_folder):
+        try:
+            build(app.static_folder)
+        except OSError:
+            # e.g. a read-only filesystem: fall back to per-request bundles.
+            app.logger.warning('could not build static assets', exc_info=True)
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.jinja_env.globals['asset_url'] = asset_url
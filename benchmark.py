@@ -0,0 +1,688 @@
+"""Route benchmarks.
+
+Drives every route of the app through the Flask test client against a
+seeded synthetic catalog and records latency percentiles and SQL query
+counts per route as JSON, e.g.
+
+    python benchmark.py --scale small --requests 50 --output bench.json
+    python benchmark.py --scale small --compare bench.json
+    python benchmark.py --scaling tiny,small,medium
+
+Set --database-url to benchmark a local postgres instead of SQLite.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+
+def percentile(values, p):
+    # nearest-rank percentile.
+    values = sorted(values)
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+def summarize(timings, queries):
+    return {
+        "requests": len(timings),
+        "p50_ms": percentile(timings, 50),
+        "p90_ms": percentile(timings, 90),
+        "p99_ms": percentile(timings, 99),
+        "mean_ms": sum(timings) / len(timings),
+        "max_ms": max(timings),
+        "queries_median": percentile(queries, 50),
+        "queries_max": max(queries),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def drivers(rng, scale):
+    """How to build one request for each endpoint: (method, url, data)."""
+    from datagen import SCALES, GENRES, WORDS, CITIES, STATES, city_location
+    num_venues, num_artists, num_shows = SCALES[scale]
+
+    def venue_id():
+        return rng.randint(1, num_venues)
+
+    def artist_id():
+        return rng.randint(1, num_artists)
+
+    def window():
+        start = datetime.strptime(show_time(), '%Y-%m-%d %H:%M:%S')
+        return start.isoformat(), (start + timedelta(hours=rng.randint(1, 48))).isoformat()
+
+    def near_city():
+        latitude, longitude = city_location(rng.choice(CITIES), rng.choice(STATES))
+        return 'lat=%.5f&lon=%.5f' % (latitude + rng.uniform(-0.1, 0.1), longitude + rng.uniform(-0.1, 0.1))
+
+    def show_time():
+        return (datetime.now() + timedelta(hours=rng.randint(0, 365 * 24))).strftime('%Y-%m-%d %H:00:00')
+
+    venue_form = {
+        'name': 'Bench Venue', 'city': 'Springfield', 'state': 'CA',
+        'address': '1 Main St', 'phone': '+14155552671', 'genres': ['Jazz', 'Blues'],
+        'facebook_link': 'https://www.facebook.com/bench', 'image_link': '',
+        'website_link': '', 'seeking_description': '',
+    }
+    artist_form = dict(venue_form, name='Bench Artist')
+    del artist_form['address']
+
+    return {
+        'index': lambda: ('GET', '/', None),
+        'venues.index': lambda: ('GET', '/venues', None),
+        'venues.venues_by_genre': lambda: ('GET', '/venues/genres/' + rng.choice(GENRES), None),
+        'venues.search_venues': lambda: ('POST', '/venues/search', {'search_term': rng.choice(WORDS).lower()}),
+        'venues.nearby_venues': lambda: ('GET', '/venues/nearby?' + near_city(), None),
+        'venues.show_venue': lambda: ('GET', '/venues/%d' % venue_id(), None),
+        'venues.venue_calendar': lambda: ('GET', '/venues/%d/calendar.ics' % venue_id(), None),
+        'venues.create_venue_form': lambda: ('GET', '/venues/create', None),
+        'venues.create_venue_submission': lambda: ('POST', '/venues/create', venue_form),
+        'venues.edit_venue': lambda: ('GET', '/venues/%d/edit' % venue_id(), None),
+        'venues.edit_venue_submission': lambda: ('POST', '/venues/%d/edit' % venue_id(), venue_form),
+        'artists.index': lambda: ('GET', '/artists', None),
+        'artists.artists_by_genre': lambda: ('GET', '/artists/genres/' + rng.choice(GENRES), None),
+        'artists.search_artists': lambda: ('POST', '/artists/search', {'search_term': rng.choice(WORDS).lower()}),
+        'artists.show_artist': lambda: ('GET', '/artists/%d' % artist_id(), None),
+        'artists.artist_calendar': lambda: ('GET', '/artists/%d/calendar.ics' % artist_id(), None),
+        'artists.create_artist_form': lambda: ('GET', '/artists/create', None),
+        'artists.create_artist_submission': lambda: ('POST', '/artists/create', artist_form),
+        'artists.edit_artist': lambda: ('GET', '/artists/%d/edit' % artist_id(), None),
+        'artists.edit_artist_submission': lambda: ('POST', '/artists/%d/edit' % artist_id(), artist_form),
+        'shows.index': lambda: ('GET', '/shows', None),
+        'shows.create_shows': lambda: ('GET', '/shows/create', None),
+        'shows.create_show_submission': lambda: ('POST', '/shows/create', {
+            'artist_id': str(artist_id()), 'venue_id': str(venue_id()),
+            'start_time': show_time(), 'duration': '90'}),
+        'metrics': lambda: ('GET', '/metrics', None),
+        'api.venues': lambda: ('GET', '/api/v1/venues', None),
+        'api.nearby_venues': lambda: ('GET', '/api/v1/venues/nearby?' + near_city(), None),
+        'api.venue': lambda: ('GET', '/api/v1/venues/%d' % venue_id(), None),
+        'api.artists': lambda: ('GET', '/api/v1/artists', None),
+        'api.artist': lambda: ('GET', '/api/v1/artists/%d' % artist_id(), None),
+        'api.shows': lambda: ('GET', '/api/v1/shows', None),
+        'api.available_venues': lambda: ('GET', '/api/v1/venues/available?date=%s&genre=%s' % (
+            show_time()[:10], rng.choice(GENRES)), None),
+        'api.available_artists': lambda: ('GET', '/api/v1/artists/available?start=%s&end=%s' % window(), None),
+        'api.availability': lambda: ('GET', '/api/v1/availability?venue_id=%d&artist_id=%d&start_time=%s' % (
+            venue_id(), artist_id(), show_time().replace(' ', 'T')), None),
+        'export.venues': lambda: ('GET', '/export/venues.' + rng.choice(['csv', 'ndjson']), None),
+        'export.artists': lambda: ('GET', '/export/artists.' + rng.choice(['csv', 'ndjson']), None),
+        'export.shows': lambda: ('GET', '/export/shows.ndjson?from=%s' % datetime.now().date(), None),
+    }
+
+
+# routes that are deliberately not driven, with the reason.
+SKIPPED = {
+    'static': 'static files',
+    'assets.dist': 'static files',
+    'assets.source_bundle': 'static files; development fallback for an unbuilt static/dist',
+    'venues.delete_venue': 'destructive; would remove catalog rows between samples',
+}
+
+
+def run(args):
+    from sqlalchemy import event, inspect
+    from sqlalchemy.engine import Engine
+    from app import create_app
+    from models import db
+    import datagen
+
+    app = create_app()
+
+    # the write routes are driven with plain form posts.
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    statements = []
+    event.listen(Engine, 'before_cursor_execute', lambda *a: statements.append(1))
+
+    with app.app_context():
+        if args.reset or not inspect(db.engine).has_table('Venue'):
+            datagen.reset()
+            started = time.perf_counter()
+            datagen.generate(args.scale, args.seed)
+            print('seeded {} catalog in {:.1f}s'.format(args.scale, time.perf_counter() - started))
+
+    rng = random.Random(args.seed)
+    table = drivers(rng, args.scale)
+    client = app.test_client()
+    results = {}
+    failures = []
+
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.endpoint):
+        endpoint = rule.endpoint
+        if endpoint in SKIPPED or endpoint in results:
+            continue
+        if endpoint not in table:
+            print('no driver for endpoint {!r}; add one to benchmark.drivers()'.format(endpoint))
+            failures.append(endpoint)
+            continue
+
+        timings, queries = [], []
+        for i in range(args.warmup + args.requests):
+            method, url, data = table[endpoint]()
+            del statements[:]
+            started = time.perf_counter()
+            # buffered: streamed bodies are read inside the timing.
+            response = client.open(url, method=method, data=data, buffered=True)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code >= 500:
+                failures.append(endpoint)
+                break
+            if i >= args.warmup:
+                timings.append(elapsed)
+                queries.append(len(statements))
+        if timings:
+            results[endpoint] = summarize(timings, queries)
+            print('{:<28} p50 {:8.2f}ms  p99 {:8.2f}ms  queries {}'.format(
+                endpoint, results[endpoint]['p50_ms'], results[endpoint]['p99_ms'],
+                results[endpoint]['queries_max']))
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "database": app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "timestamp": datetime.now().isoformat(),
+        },
+        "routes": results,
+        "failures": sorted(set(failures)),
+    }
+
+
+def filter_benchmark(iterations, seed):
+    """Per-tile cost of the datetime filter: the old str()/dateutil/babel
+    round trip against the cached formatter and the batch helper."""
+    import babel.dates
+    import dateutil.parser
+    from filters import DATETIME_FORMATS, format_datetime, format_datetimes
+
+    rng = random.Random(seed)
+    start = datetime(2030, 1, 1)
+    # on-the-hour start times over two years, as datagen builds them.
+    values = [start + timedelta(hours=rng.randint(0, 2 * 365 * 24)) for i in range(iterations)]
+
+    def string_parse():
+        return [babel.dates.format_datetime(dateutil.parser.parse(str(value)), DATETIME_FORMATS['full'],
+                                            locale='en') for value in values]
+
+    cases = [
+        ('string_parse', string_parse),
+        ('cached', lambda: [format_datetime(value, 'full') for value in values]),
+        ('batch', lambda: format_datetimes(values, 'full')),
+    ]
+    results, expected = {}, None
+    for name, case in cases:
+        started = time.perf_counter()
+        labels = case()
+        elapsed = time.perf_counter() - started
+        if expected is not None and labels != expected:
+            raise AssertionError('{} formats differently from string_parse'.format(name))
+        expected = labels
+        results[name] = {"us_per_tile": elapsed / iterations * 1e6}
+        print('datetime filter {:<13} {:8.2f}us/tile'.format(name, results[name]['us_per_tile']))
+    return results
+
+
+# what a new worker serves first: a page from each blueprint and a form.
+STARTUP_URLS = ['/', '/venues', '/venues/create', '/artists/1', '/shows']
+
+BOOT_SCRIPT = """
+import time
+started = time.perf_counter()
+from app import create_app
+app = create_app(migrations=False)
+booted = time.perf_counter()
+client = app.test_client()
+for url in {urls!r}:
+    client.get(url)
+print(booted - started, time.perf_counter() - booted)
+"""
+
+
+def startup(args):
+    """Worker start-up, median of --boot-samples runs: a fresh interpreter
+    importing and building the app (boot) and serving its first requests,
+    and a worker forked from a process that preloaded the app with
+    create_app(preload=True) serving the same requests (fork)."""
+    from statistics import median
+    from app import create_app
+
+    script = BOOT_SCRIPT.format(urls=STARTUP_URLS)
+    boots, firsts = [], []
+    for i in range(args.boot_samples):
+        output = subprocess.check_output([sys.executable, '-c', script], stderr=subprocess.DEVNULL,
+                                         cwd=os.path.dirname(os.path.abspath(__file__)))
+        boot, first = output.decode().split()[-2:]
+        boots.append(float(boot) * 1000)
+        firsts.append(float(first) * 1000)
+    results = {"boot_ms": median(boots), "first_requests_ms": median(firsts)}
+
+    if hasattr(os, 'fork'):
+        app = create_app(preload=True, migrations=False)
+        forks = []
+        for i in range(args.boot_samples):
+            ready, notify = os.pipe()
+            started = time.perf_counter()
+            pid = os.fork()
+            if pid == 0:
+                client = app.test_client()
+                for url in STARTUP_URLS:
+                    client.get(url)
+                os.write(notify, b'.')
+                os._exit(0)
+            os.read(ready, 1)
+            forks.append((time.perf_counter() - started) * 1000)
+            os.waitpid(pid, 0)
+            os.close(ready)
+            os.close(notify)
+        results['fork_ms'] = median(forks)
+
+    print('startup: boot {:.0f}ms, first requests {:.0f}ms, forked worker first requests {}'.format(
+        results['boot_ms'], results['first_requests_ms'],
+        '{:.0f}ms'.format(results['fork_ms']) if 'fork_ms' in results else '-'))
+    return results
+
+
+def template_benchmark(tiles, seed):
+    """Template caching: loading every template from source against
+    loading it from the bytecode cache, and rendering /shows and /venues
+    pages of --tiles tiles with {% cache %} off, with an empty fragment
+    store (cold) and with every tile already stored (warm)."""
+    import tempfile
+    from types import SimpleNamespace
+    from flask import render_template
+    from jinja2 import FileSystemBytecodeCache
+    from app import create_app
+    from cache import LRUCache
+
+    def load_templates(bytecode_cache):
+        # a new app, so nothing is compiled yet.
+        app = create_app(migrations=False)
+        app.jinja_env.bytecode_cache = bytecode_cache
+        started = time.perf_counter()
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        return (time.perf_counter() - started) * 1000
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        results['compile_ms'] = load_templates(None)
+        # the first load fills the directory, as the first worker would.
+        load_templates(FileSystemBytecodeCache(directory))
+        results['bytecode_ms'] = load_templates(FileSystemBytecodeCache(directory))
+    print('templates: all from source {:.0f}ms, from bytecode cache {:.0f}ms'.format(
+        results['compile_ms'], results['bytecode_ms']))
+
+    rng = random.Random(seed)
+    updated = datetime(2030, 1, 1)
+    shows = [SimpleNamespace(
+        id=i, start_time=updated + timedelta(hours=rng.randint(0, 2 * 365 * 24)), updated_at=updated,
+        venue_id=i % 500, venue_name='Venue {}'.format(i % 500), venue_updated_at=updated,
+        artist_id=i % 700, artist_name='Artist {}'.format(i % 700), artist_updated_at=updated,
+        artist_image_link='https://example.com/{}.jpg'.format(i % 700),
+    ) for i in range(tiles)]
+    # areas of 20 venues.
+    areas = [{
+        "city": 'City {}'.format(i),
+        "state": 'ST',
+        "venues": [{"id": id, "name": 'Venue {}'.format(id), "updated_at": updated}
+                   for id in range(i * 20, min(tiles, i * 20 + 20))],
+    } for i in range((tiles + 19) // 20)]
+    pages = [('shows', 'pages/shows.html', {'shows': shows}), ('venues', 'pages/venues.html', {'areas': areas})]
+
+    app = create_app(migrations=False)
+    fragments = app.extensions['fragment_cache']
+    for page, template, context in pages:
+        timings, expected = {}, None
+        with app.test_request_context('/' + page):
+            for case in ('uncached', 'cold', 'warm'):
+                app.config['FRAGMENT_CACHE'] = case != 'uncached'
+                if case == 'cold':
+                    fragments.backend = LRUCache(2 * tiles)
+                started = time.perf_counter()
+                html = render_template(template, next_cursor=None, **context)
+                timings[case + '_ms'] = (time.perf_counter() - started) * 1000
+                if expected is not None and html != expected:
+                    raise AssertionError('{} {} renders differently from uncached'.format(page, case))
+                expected = html
+        results[page] = timings
+        print('{} tiles on /{}: uncached {:.0f}ms, cold {:.0f}ms, warm {:.0f}ms'.format(
+            tiles, page, timings['uncached_ms'], timings['cold_ms'], timings['warm_ms']))
+    return results
+
+
+# read routes served by asgi.py's async views.
+THROUGHPUT_ENDPOINTS = ['venues.index', 'artists.index', 'shows.index', 'venues.show_venue', 'artists.show_artist']
+
+
+async def asgi_get(application, url):
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '', 'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def throughput(args):
+    """Requests per second on the read routes with --concurrency requests
+    in flight: the WSGI app on a pool of --workers threads (one request per
+    worker, as under a sync server) against asgi.py on one event loop."""
+    from concurrent.futures import ThreadPoolExecutor
+    import asgi
+
+    app = asgi.app
+
+    rng = random.Random(args.seed)
+    table = drivers(rng, args.scale)
+    urls = [table[rng.choice(THROUGHPUT_ENDPOINTS)]()[1] for i in range(args.concurrency * 20)]
+
+    def wsgi_get(url):
+        return app.test_client().get(url).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.workers) as pool:
+        statuses = list(pool.map(wsgi_get, urls))
+    wsgi_rps = len(urls) / (time.perf_counter() - started)
+    failed = sum(status >= 500 for status in statuses)
+
+    async def run_asgi():
+        limit = asyncio.Semaphore(args.concurrency)
+
+        async def one(url):
+            async with limit:
+                return await asgi_get(asgi.application, url)
+        try:
+            return await asyncio.gather(*[one(url) for url in urls])
+        finally:
+            await asgi.dispose()
+
+    started = time.perf_counter()
+    statuses = asyncio.run(run_asgi())
+    asgi_rps = len(urls) / (time.perf_counter() - started)
+    failed += sum(status >= 500 for status in statuses)
+
+    print('throughput at concurrency {}: wsgi ({} threads) {:.0f} req/s, asgi {:.0f} req/s'.format(
+        args.concurrency, args.workers, wsgi_rps, asgi_rps))
+    return {
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "requests": len(urls),
+        "wsgi_rps": wsgi_rps,
+        "asgi_rps": asgi_rps,
+        "failures": failed,
+    }
+
+
+def hot_search(args):
+    """--hot-search identical searches posted at once from --workers
+    threads, with the result cache and coalescing off and on: wall time and
+    how many reached the database."""
+    from concurrent.futures import ThreadPoolExecutor
+    from app import create_app
+    from datagen import WORDS
+
+    term = random.Random(args.seed).choice(WORDS).lower()
+    results = {}
+    for case, ttl in (('direct', 0), ('coalesced', 10)):
+        app = create_app()
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SEARCH_CACHE_TTL'] = ttl
+
+        def post(i):
+            return app.test_client().post('/venues/search', data={'search_term': term}).status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.workers) as pool:
+            statuses = list(pool.map(post, range(args.hot_search)))
+        elapsed = (time.perf_counter() - started) * 1000
+        with app.app_context():
+            stats = app.extensions['search'].stats()
+        results[case] = {
+            "ms": elapsed,
+            "queries": args.hot_search if not ttl else stats['queries'],
+            "coalesced": stats['coalesced'],
+            "cached": stats['cached'],
+            "failures": sum(status >= 500 for status in statuses),
+        }
+        print('hot search {:<10} {} posts in {:8.0f}ms: {} searched, {} coalesced, {} cached'.format(
+            case, args.hot_search, elapsed, results[case]['queries'], stats['coalesced'], stats['cached']))
+    return results
+
+
+# how much more a show may cost to list at the largest --scaling catalog
+# than at the smallest before the run counts as failed.
+SCALING_TOLERANCE = 3
+NEXT_PAGE = re.compile(r'<li class="next"><a href="([^"]+)"')
+
+
+def scaling(args):
+    """/shows across catalog sizes: every page walked through its next
+    links, --limit at MAX_PAGE_SIZE. Keyset pagination keeps each page's
+    time and queries flat, so the whole walk should grow linearly in the
+    number of shows. Each scale gets its own SQLite catalog,
+    bench-<scale>.db, seeded when missing or with --reset."""
+    from html import unescape
+    from sqlalchemy import event, func, inspect, select
+    from sqlalchemy.engine import Engine
+    from app import create_app
+    from models import db, Show
+    import config
+    import datagen
+
+    statements = []
+    listener = lambda *a: statements.append(1)
+    event.listen(Engine, 'before_cursor_execute', listener)
+    results = {}
+    try:
+        for scale in args.scaling:
+            url = 'sqlite:///' + os.path.abspath('bench-{}.db'.format(scale))
+            app = create_app()
+            app.config.update(SQLALCHEMY_DATABASE_URI=url, SQLALCHEMY_ENGINE_OPTIONS=config.engine_options(url),
+                              SQLALCHEMY_BINDS={})
+            with app.app_context():
+                if args.reset or not inspect(db.engine).has_table('Venue'):
+                    datagen.reset()
+                    datagen.generate(scale, args.seed)
+                count = db.session.execute(select(func.count()).select_from(Show)).scalar()
+
+            client = app.test_client()
+            page = '/shows?limit={}'.format(app.config['MAX_PAGE_SIZE'])
+            for i in range(args.warmup):
+                client.get(page)
+            timings, queries, failed = [], [], False
+            started = time.perf_counter()
+            while page is not None:
+                del statements[:]
+                before = time.perf_counter()
+                response = client.get(page)
+                timings.append((time.perf_counter() - before) * 1000)
+                queries.append(len(statements))
+                if response.status_code != 200:
+                    failed = True
+                    break
+                link = NEXT_PAGE.search(response.get_data(as_text=True))
+                page = unescape(link.group(1)) if link else None
+            walk = (time.perf_counter() - started) * 1000
+            results[scale] = {
+                "shows": count,
+                "pages": len(timings),
+                "page_p50_ms": percentile(timings, 50),
+                "queries_max": max(queries),
+                "walk_ms": walk,
+                "us_per_show": walk * 1000 / max(count, 1),
+                "failed": failed,
+            }
+            print('scaling /shows {:<8} {:>8} shows  {:>5} pages  page p50 {:7.2f}ms  queries {}  '
+                  'walk {:8.0f}ms  {:6.1f}us/show'.format(
+                      scale, count, len(timings), results[scale]['page_p50_ms'], max(queries), walk,
+                      results[scale]['us_per_show']))
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', listener)
+
+    first, last = results[args.scaling[0]], results[args.scaling[-1]]
+    growth = last['us_per_show'] / first['us_per_show']
+    linear = growth <= SCALING_TOLERANCE
+    print('scaling /shows: per-show cost x{:.2f} from {} to {} ({})'.format(
+        growth, args.scaling[0], args.scaling[-1], 'linear' if linear else 'superlinear'))
+    return {
+        "scales": results,
+        "growth": growth,
+        "linear": linear,
+        "flat_queries": len({stats['queries_max'] for stats in results.values()}) == 1,
+    }
+
+
+def compare(old, new):
+    print('{:<28} {:>12} {:>12} {:>8}   queries'.format('endpoint', 'old p50', 'new p50', 'change'))
+    for endpoint, stats in sorted(new['routes'].items()):
+        before = old['routes'].get(endpoint)
+        if before is None:
+            print('{:<28} {:>12} {:>10.2f}ms'.format(endpoint, '-', stats['p50_ms']))
+            continue
+        change = (stats['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+        print('{:<28} {:>10.2f}ms {:>10.2f}ms {:>+7.1f}%   {} -> {}'.format(
+            endpoint, before['p50_ms'], stats['p50_ms'], change,
+            before['queries_max'], stats['queries_max']))
+    for page in ('shows', 'venues'):
+        before, after = old.get('templates', {}).get(page), new.get('templates', {}).get(page)
+        if before is not None and after is not None:
+            for case in ('uncached_ms', 'warm_ms'):
+                print('/{} tiles {:<13} {:>10.0f}ms {:>10.0f}ms'.format(page, case, before[case], after[case]))
+    for name, stats in sorted(new.get('startup', {}).items()):
+        before = old.get('startup', {}).get(name)
+        if before is not None:
+            print('startup {:<20} {:>10.0f}ms {:>10.0f}ms'.format(name, before, stats))
+    if 'throughput' in old and 'throughput' in new:
+        for server in ('wsgi_rps', 'asgi_rps'):
+            print('throughput {:<17} {:>8.0f}/s {:>8.0f}/s'.format(
+                server, old['throughput'][server], new['throughput'][server]))
+    if 'hot_search' in old and 'hot_search' in new:
+        for case in ('direct', 'coalesced'):
+            print('hot search {:<17} {:>10.0f}ms {:>10.0f}ms'.format(
+                case, old['hot_search'][case]['ms'], new['hot_search'][case]['ms']))
+    if 'scaling' in old and 'scaling' in new:
+        for scale, stats in sorted(new['scaling']['scales'].items(), key=lambda item: item[1]['shows']):
+            before = old['scaling']['scales'].get(scale)
+            if before is not None:
+                print('scaling /shows {:<13} {:>8.1f}us {:>8.1f}us   per show'.format(
+                    scale, before['us_per_show'], stats['us_per_show']))
+    for name, stats in sorted(new.get('micro', {}).items()):
+        before = old.get('micro', {}).get(name)
+        if before is not None:
+            print('datetime filter {:<12} {:>10.2f}us {:>10.2f}us'.format(
+                name, before['us_per_tile'], stats['us_per_tile']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='tiny', choices=['tiny', 'small', 'medium', 'large'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=20, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.abspath('bench.db'))
+    parser.add_argument('--reset', action='store_true', help='rebuild the catalog before running')
+    parser.add_argument('--cache', action='store_true', help='keep the page cache enabled')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--check', action='store_true', help='exit non-zero if any route fails')
+    parser.add_argument('--strict', action='store_true', help='fail routes that repeat a statement shape')
+    parser.add_argument('--concurrency', type=int, default=0,
+                        help='also compare WSGI and ASGI requests/s with this many requests in flight')
+    parser.add_argument('--workers', type=int, default=4, help='WSGI worker threads for --concurrency')
+    parser.add_argument('--micro-iterations', type=int, default=5000,
+                        help='show tiles formatted by the datetime filter microbenchmark')
+    parser.add_argument('--tiles', type=int, default=10000,
+                        help='tiles on the pages rendered by the template caching benchmark; 0 skips it')
+    parser.add_argument('--hot-search', type=int, default=0,
+                        help='also post this many identical searches at once, without and with coalescing')
+    parser.add_argument('--boot-samples', type=int, default=3,
+                        help='worker start-up runs to take the median of; 0 skips the measurement')
+    parser.add_argument('--scaling', type=lambda value: value.split(','), default=[],
+                        help='comma-separated scales, smallest first, to walk every /shows page at')
+    args = parser.parse_args(argv)
+    unknown = set(args.scaling) - {'tiny', 'small', 'medium', 'large'}
+    if unknown:
+        parser.error('unknown --scaling scales: ' + ', '.join(sorted(unknown)))
+
+    # configuration is read when create_app() loads config.py.
+    os.environ['DATABASE_URL'] = args.database_url
+    if not args.cache:
+        os.environ['CACHE_DEFAULT_TTL'] = '0'
+        os.environ['FRAGMENT_CACHE'] = '0'
+        os.environ['SEARCH_CACHE_TTL'] = '0'
+    if args.strict:
+        os.environ['SQL_N_PLUS_ONE_STRICT'] = '1'
+    # routes are timed one client at a time, far above any per-client limit.
+    os.environ['SEARCH_RATE_LIMIT'] = '0'
+
+    results = run(args)
+    results['micro'] = filter_benchmark(args.micro_iterations, args.seed)
+    if args.tiles:
+        results['templates'] = template_benchmark(args.tiles, args.seed)
+    if args.boot_samples:
+        results['startup'] = startup(args)
+    if args.hot_search:
+        results['hot_search'] = hot_search(args)
+        if any(case['failures'] for case in results['hot_search'].values()):
+            results['failures'].append('hot_search')
+    if args.scaling:
+        results['scaling'] = scaling(args)
+        outcome = results['scaling']
+        if not (outcome['linear'] and outcome['flat_queries']) or any(
+                stats['failed'] for stats in outcome['scales'].values()):
+            results['failures'].append('scaling')
+    if args.concurrency:
+        results['throughput'] = throughput(args)
+        if results['throughput']['failures']:
+            results['failures'].append('throughput')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    if results['failures']:
+        print('failed: ' + ', '.join(results['failures']))
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
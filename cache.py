@@ -0,0 +1,271 @@
+import hashlib
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request, session
+
+#----------------------------------------------------------------------------#
+# Rendered-page cache.
+#----------------------------------------------------------------------------#
+
+# Pages are cached under a key built from the endpoint, its arguments and
+# the current version of every tag the page depends on ('venues',
+# 'venue:3', ...). Writes bump the versions of the tags they affect, so
+# stale entries are never read again and simply age out of the backend.
+
+
+class LRUCache(object):
+    """In-process backend: bounded LRU of entries plus tag counters."""
+
+    # other workers' invalidations never reach these counters.
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.times = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_counters(self, names):
+        with self.lock:
+            return [self.counters.get(name, 0) for name in names]
+
+    def incr(self, name):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+            self.times[name] = time.time()
+            return self.counters[name]
+
+    def get_times(self, names):
+        with self.lock:
+            return [self.times.get(name) for name in names]
+
+
+class SharedCache(object):
+    """Backend over a redis-style client (get, set with ex=, mget, incr),
+    shared by every worker."""
+
+    shared = True
+
+    def __init__(self, client, prefix='fyyur:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def get_counters(self, names):
+        if not names:
+            return []
+        values = self.client.mget([self.prefix + 'tag:' + name for name in names])
+        return [int(value or 0) for value in values]
+
+    def incr(self, name):
+        self.client.set(self.prefix + 'tagtime:' + name, repr(time.time()))
+        return self.client.incr(self.prefix + 'tag:' + name)
+
+    def get_times(self, names):
+        if not names:
+            return []
+        values = self.client.mget([self.prefix + 'tagtime:' + name for name in names])
+        return [float(value) if value is not None else None for value in values]
+
+
+class ResponseCache(object):
+
+    def __init__(self, app=None, backend=None):
+        self._backend = backend
+        self.default_ttl = 300
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+        backend = self._backend
+        if backend is None:
+            url = app.config.get('CACHE_REDIS_URL')
+            if url:
+                import redis
+                backend = SharedCache(redis.Redis.from_url(url))
+            else:
+                backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        app.extensions['response_cache'] = backend
+
+    @property
+    def backend(self):
+        # each app gets its own store unless one was passed in explicitly.
+        return current_app.extensions['response_cache']
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.incr(tag)
+        self.invalidations += len(tags)
+
+    def expire_at(self, when):
+        # Shorten the lifetime of the page being rendered, e.g. to the
+        # start of the next show, when it moves from upcoming to past.
+        if when is not None:
+            current = g.get('cache_expires_at')
+            g.cache_expires_at = when if current is None else min(current, when)
+
+    def keep_for(self, seconds):
+        # Keep the page being rendered longer than CACHE_DEFAULT_TTL, for
+        # pages that nothing but a tag bump can make stale. Only a shared
+        # backend sees every worker's bumps; in process such a page is not
+        # stored at all.
+        g.cache_ttl = seconds if self.backend.shared else 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    def _key(self, tags):
+        versions = self.backend.get_counters(tags)
+        return '|'.join([
+            'page',
+            request.endpoint,
+            repr(sorted(request.view_args.items())),
+            repr(sorted(request.args.items(multi=True))),
+        ] + ['{}={}'.format(tag, version) for tag, version in zip(tags, versions)])
+
+    def _tags(self, tags):
+        return [tag.format(**request.view_args) for tag in tags]
+
+    def _ttl(self):
+        ttl = g.get('cache_ttl', self.default_ttl)
+        expires_at = g.get('cache_expires_at')
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now()).total_seconds())
+        return ttl
+
+    def _lookup(self, tags):
+        # (key to store under, cached response or None). No key when the
+        # request isn't cacheable: pages carrying a flashed message are
+        # one-offs.
+        if request.method != 'GET' or '_flashes' in session:
+            return None, None
+        key = self._key(self._tags(tags))
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        body, status, mimetype = entry
+        response = Response(body, status=status, mimetype=mimetype)
+        response.headers['X-Cache'] = 'HIT'
+        return key, response
+
+    def _store(self, key, rv):
+        response = make_response(rv)
+        if key is None:
+            return response
+        ttl = self._ttl()
+        if response.status_code == 200 and ttl > 0 and '_flashes' not in session:
+            self.backend.set(key, (response.get_data(), response.status_code, response.mimetype), ttl)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def cached(self, *tags):
+        """Cache a GET view. Tags may reference view arguments,
+        e.g. 'venue:{venue_id}'. Works on async views too."""
+        def decorator(view):
+            if inspect.iscoroutinefunction(view):
+                @wraps(view)
+                async def async_wrapper(*args, **kwargs):
+                    key, response = self._lookup(tags)
+                    if response is not None:
+                        return response
+                    return self._store(key, await view(*args, **kwargs))
+                return async_wrapper
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key, response = self._lookup(tags)
+                if response is not None:
+                    return response
+                return self._store(key, view(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def conditional(self, *tags):
+        """ETag/Last-Modified for a GET view. With a shared backend they
+        are derived from tag versions only, so a revalidation that matches
+        costs no database work. In process, another worker's write doesn't
+        move this worker's versions: the ETag is then a hash of the
+        rendered body, and there is no Last-Modified. Streamed bodies
+        aren't hashed, which would buffer them; they get no validators."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.backend.shared:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    response.set_etag(hashlib.sha1(response.get_data()).hexdigest(), weak=True)
+                    return response.make_conditional(request)
+
+                names = self._tags(tags)
+                etag = hashlib.sha1(self._key(names).encode()).hexdigest()
+                # a tag never bumped has no time; the workers' start times
+                # differ, so there is then no Last-Modified either.
+                times = self.backend.get_times(names)
+                last_modified = None
+                if times and None not in times:
+                    last_modified = datetime.utcfromtimestamp(int(max(times)))
+
+                if request.if_none_match:
+                    not_modified = request.if_none_match.contains_weak(etag)
+                else:
+                    not_modified = (last_modified is not None and request.if_modified_since is not None and
+                                    request.if_modified_since.replace(tzinfo=None) >= last_modified)
+                if not_modified:
+                    response = Response(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+                return response
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
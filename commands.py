@@ -0,0 +1,152 @@
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import bindparam, select, update
+
+from models import db, Venue
+from cache import response_cache
+import show_stats
+import assets
+import geo
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+# datagen and importer (which pulls in the forms) are only imported by the
+# commands that use them, not by every worker.
+
+#  Show statistics
+#  ----------------------------------------------------------------
+
+show_stats_cli = AppGroup('show-stats', help='Maintain the show_stats rollup.')
+
+
+@show_stats_cli.command('roll')
+def roll_show_stats():
+    """Move shows that have started from upcoming to past."""
+    rolled = show_stats.roll(datetime.now())
+    db.session.commit()
+    if rolled:
+        # both listings show num_upcoming_shows.
+        response_cache.invalidate('venues', 'artists', *['%s:%s' % (type, id) for type, id in rolled])
+    click.echo('Rolled {} venues/artists.'.format(len(rolled)))
+
+
+@show_stats_cli.command('rebuild')
+def rebuild_show_stats():
+    """Recompute show_stats from the Show table."""
+    show_stats.rebuild(datetime.now())
+    db.session.commit()
+    response_cache.invalidate('venues', 'artists')
+    click.echo('Rebuilt show_stats.')
+
+
+#  Catalog
+#  ----------------------------------------------------------------
+
+@click.command('seed')
+@click.option('--scale', type=click.Choice(['tiny', 'small', 'medium', 'large']), default='small')
+@click.option('--seed', default=42, help='Random seed; same seed, same catalog.')
+@click.option('--reset', is_flag=True, help='Drop and recreate all tables first.')
+@with_appcontext
+def seed(scale, seed, reset):
+    """Fill the database with a synthetic catalog."""
+    import datagen
+    if reset:
+        datagen.reset()
+    datagen.generate(scale, seed)
+    click.echo('Seeded {} catalog: {} venues, {} artists, {} shows.'.format(scale, *datagen.SCALES[scale]))
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['artists', 'shows', 'venues']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=5000, help='Rows validated and loaded per transaction.')
+@click.option('--rejects', help='Where to write rejected rows (default: PATH.rejects.ndjson).')
+@with_appcontext
+def import_rows(kind, path, batch_size, rejects):
+    """Bulk load venues, artists or shows from a .csv or .ndjson file."""
+    import importer
+    rejects = rejects or path + '.rejects.ndjson'
+
+    def progress(accepted, rejected, seconds):
+        click.echo('  {} loaded, {} rejected ({:.0f} rows/s)'.format(
+            accepted, rejected, (accepted + rejected) / seconds if seconds else 0))
+
+    accepted, rejected, touched, seconds = importer.import_file(kind, path, rejects, batch_size, progress)
+
+    # new ids have nothing cached yet; only list pages and the detail pages
+    # of venues/artists that gained shows are stale.
+    response_cache.invalidate('venues', 'artists', 'shows', *['%s:%s' % (type, id) for type, id in touched])
+    click.echo('Imported {} {} in {:.1f}s ({:.0f} rows/s); {} rejected{}.'.format(
+        accepted, kind, seconds, (accepted + rejected) / seconds if seconds else 0,
+        rejected, ' -> ' + rejects if rejected else ''))
+
+
+#  Geocoding
+#  ----------------------------------------------------------------
+
+@click.command('geocode')
+@click.option('--table', type=click.Path(exists=True, dir_okay=False),
+              help='Lookup table (.csv or .ndjson); defaults to GEOCODE_TABLE.')
+@click.option('--all', 'everything', is_flag=True, help='Also redo venues that already have coordinates.')
+@click.option('--batch-size', default=5000, help='Venues updated per transaction.')
+@with_appcontext
+def geocode(table, everything, batch_size):
+    """Set venue coordinates from a local lookup table."""
+    table = table or current_app.config.get('GEOCODE_TABLE')
+    if not table:
+        raise click.UsageError('no lookup table: pass --table or set GEOCODE_TABLE.')
+    geocoder = geo.TableGeocoder(table)
+    stmt = update(Venue.__table__).where(Venue.id == bindparam('venue_id')).values(
+        latitude=bindparam('lat'), longitude=bindparam('lon'), geohash=bindparam('hash'))
+
+    located = missing = last_id = 0
+    while True:
+        query = select(Venue.id, Venue.address, Venue.city, Venue.state).where(
+            Venue.id > last_id).order_by(Venue.id).limit(batch_size)
+        if not everything:
+            query = query.where(Venue.latitude.is_(None))
+        rows = db.session.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        values = []
+        for row in rows:
+            point = geocoder.lookup(row.address, row.city, row.state)
+            if point is None:
+                missing += 1
+                continue
+            values.append({'venue_id': row.id, 'lat': point[0], 'lon': point[1],
+                           'hash': geo.encode(*point)})
+        if values:
+            db.session.execute(stmt, values)
+        db.session.commit()
+        located += len(values)
+    click.echo('Geocoded {} venues; {} not in the table.'.format(located, missing))
+
+
+#  Static assets
+#  ----------------------------------------------------------------
+
+assets_cli = AppGroup('assets', help='Build the static asset bundles.')
+
+
+@assets_cli.command('build')
+def build_assets():
+    """Bundle, minify, fingerprint and compress the static assets."""
+    manifest = assets.build(current_app.static_folder)
+    current_app.extensions['assets'] = manifest
+    for name, filename in sorted(manifest.items()):
+        click.echo('{} -> {}/{}'.format(name, assets.DIST, filename))
+
+
+def init_app(app):
+    app.cli.add_command(show_stats_cli)
+    app.cli.add_command(seed)
+    app.cli.add_command(import_rows)
+    app.cli.add_command(geocode)
+    app.cli.add_command(assets_cli)
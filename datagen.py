@@ -0,0 +1,173 @@
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, func
+
+from models import db, Venue, Artist, Show, Genre, venue_genre, artist_genre, DEFAULT_SHOW_MINUTES
+import show_stats
+import geo
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#----------------------------------------------------------------------------#
+
+# Seeded catalogs for benchmarking. The same (scale, seed) always builds
+# the same rows, so runs on different commits are comparable.
+
+SCALES = {
+    # venues, artists, shows
+    'tiny': (100, 100, 1000),
+    'small': (1000, 1000, 10000),
+    'medium': (10000, 10000, 100000),
+    'large': (100000, 100000, 1000000),
+}
+
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll',
+    'Soul', 'Other',
+]
+
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL', 'LA', 'TN', 'GA', 'FL', 'CO']
+
+CITIES = [
+    'Springfield', 'Riverside', 'Franklin', 'Greenville', 'Bristol',
+    'Clinton', 'Fairview', 'Salem', 'Madison', 'Georgetown', 'Arlington',
+    'Ashland', 'Dover', 'Oxford', 'Jackson', 'Burlington', 'Manchester',
+    'Milton', 'Newport', 'Auburn',
+]
+
+WORDS = [
+    'Musical', 'Hop', 'Park', 'Square', 'Live', 'Music', 'Coffee', 'Dueling',
+    'Pianos', 'Bar', 'Wild', 'Sax', 'Band', 'Guns', 'Petals', 'Blue', 'Note',
+    'Velvet', 'Room', 'Echo', 'Lounge', 'Hall', 'Stage', 'Electric', 'Owl',
+    'Rose', 'Garden', 'Hollow', 'Summit', 'Tavern', 'Crystal', 'Harbor',
+]
+
+BATCH_SIZE = 5000
+
+# venues are scattered around a made-up centre for each (city, state).
+CITY_SPREAD_DEGREES = 0.05
+
+
+def _name(rng, i):
+    return '{} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS), i)
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def city_location(city, state):
+    # (latitude, longitude) inside the continental US; the same for every
+    # seed, so benchmarks can aim queries at cities.
+    rng = random.Random('{}|{}'.format(city, state))
+    return rng.uniform(30, 47), rng.uniform(-122, -75)
+
+
+def _locate(rng, venue):
+    latitude, longitude = city_location(venue['city'], venue['state'])
+    venue['latitude'] = round(rng.gauss(latitude, CITY_SPREAD_DEGREES), 6)
+    venue['longitude'] = round(rng.gauss(longitude, CITY_SPREAD_DEGREES), 6)
+    venue['geohash'] = geo.encode(venue['latitude'], venue['longitude'])
+    return venue
+
+
+def _genre_links(rng, key, ids, genre_ids):
+    return [{key: id, 'genre_id': genre_id}
+            for id in ids
+            for genre_id in rng.sample(genre_ids, rng.randint(1, 3))]
+
+
+def reset():
+    db.drop_all()
+    db.create_all()
+
+
+def generate(scale='small', seed=42, now=None):
+    """Fill an empty database with a catalog of the given scale."""
+    num_venues, num_artists, num_shows = SCALES[scale]
+    rng = random.Random(seed)
+    now = now or datetime.now()
+
+    _insert(Genre, [{'id': i + 1, 'name': name} for i, name in enumerate(GENRES)])
+    genre_ids = list(range(1, len(GENRES) + 1))
+
+    venue_ids = list(range(1, num_venues + 1))
+    # locations use their own generator so the rest of the catalog is the
+    # same as before venues had them.
+    location_rng = random.Random(seed + 1)
+    venues = [{
+        'id': id,
+        'name': _name(rng, id),
+        'city': rng.choice(CITIES),
+        'state': rng.choice(STATES),
+        'address': '{} {} St'.format(rng.randint(1, 9999), rng.choice(WORDS)),
+        'phone': '326-555-{:04d}'.format(rng.randint(0, 9999)),
+        'image_link': 'https://example.com/venues/{}.jpg'.format(id),
+        'facebook_link': 'https://www.facebook.com/venue{}'.format(id),
+        'website_link': 'https://venue{}.example.com'.format(id),
+        'looking_for_talent': rng.random() < 0.3,
+        'seeking_description': 'Looking for local talent.',
+    } for id in venue_ids]
+    _insert(Venue, [_locate(location_rng, venue) for venue in venues])
+    _insert(venue_genre, _genre_links(rng, 'venue_id', venue_ids, genre_ids))
+
+    artist_ids = list(range(1, num_artists + 1))
+    _insert(Artist, [{
+        'id': id,
+        'name': _name(rng, id),
+        'city': rng.choice(CITIES),
+        'state': rng.choice(STATES),
+        'phone': '326-555-{:04d}'.format(rng.randint(0, 9999)),
+        'image_link': 'https://example.com/artists/{}.jpg'.format(id),
+        'facebook_link': 'https://www.facebook.com/artist{}'.format(id),
+        'website_link': 'https://artist{}.example.com'.format(id),
+        'looking_for_venue': rng.random() < 0.3,
+        'seeking_description': 'Looking for shows.',
+    } for id in artist_ids])
+    _insert(artist_genre, _genre_links(rng, 'artist_id', artist_ids, genre_ids))
+
+    # shows spread over a year either side of `now`, on the hour, never
+    # double-booking a venue or an artist.
+    start = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=365)
+    hours = 2 * 365 * 24
+    length = DEFAULT_SHOW_MINUTES // 60
+    # booked (id, hour) pairs, packed into ints to keep large scales small.
+    span = hours + 2 * length
+    venue_hours, artist_hours = set(), set()
+    shows = []
+    while len(shows) < num_shows:
+        venue_id, artist_id = rng.choice(venue_ids), rng.choice(artist_ids)
+        hour = rng.randint(0, hours)
+        nearby = range(hour + 1, hour + 2 * length)
+        if any(venue_id * span + h in venue_hours or artist_id * span + h in artist_hours for h in nearby):
+            continue
+        venue_hours.add(venue_id * span + hour + length)
+        artist_hours.add(artist_id * span + hour + length)
+        shows.append({
+            'id': len(shows) + 1,
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'start_time': start + timedelta(hours=hour),
+            'duration_minutes': DEFAULT_SHOW_MINUTES,
+        })
+    _insert(Show, shows)
+
+    show_stats.rebuild(now)
+    db.session.commit()
+    _reset_sequences()
+
+
+def _reset_sequences():
+    # explicit ids leave postgres sequences behind; move them past the data.
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in (Genre, Venue, Artist, Show):
+        table = model.__tablename__
+        db.session.execute(select(func.setval(
+            func.pg_get_serial_sequence('"{}"'.format(table), 'id'),
+            select(func.max(model.id)).scalar_subquery())))
+    db.session.commit()
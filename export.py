@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+from sqlalchemy import literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from models import db, Venue, Artist, Show, Genre
+from queries import GENRE_LINKS
+from cache import response_cache
+from routing import use_replica
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+# Full-catalog dumps as CSV or NDJSON. Rows come off a server-side cursor
+# in batches of YIELD_PER and are written out as they arrive, so memory
+# stays flat however large the export and the first bytes go out before
+# the query has finished.
+
+export = Blueprint('export', __name__, url_prefix='/export')
+export.before_request(use_replica)
+
+YIELD_PER = 1000
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def genre_names(model):
+    # the entity's genres as one ';'-separated column, aggregated in SQL.
+    link, key = GENRE_LINKS[model]
+    genres = select(Genre.name).join(link, link.c.genre_id == Genre.id).where(key == model.id)
+    if db.engine.dialect.name == 'postgresql':
+        names = db.func.string_agg(Genre.name, aggregate_order_by(literal(';'), Genre.name))
+        return genres.with_only_columns(names).scalar_subquery().label('genres')
+    # group_concat keeps the order of an ordered subquery in practice.
+    names = genres.order_by(Genre.name).subquery()
+    return select(db.func.group_concat(names.c.name, ';')).scalar_subquery().label('genres')
+
+
+def in_area(stmt, model):
+    # ?city=&state= filters, matched exactly.
+    if request.args.get('state'):
+        stmt = stmt.where(model.state == request.args['state'])
+    if request.args.get('city'):
+        stmt = stmt.where(model.city == request.args['city'])
+    return stmt
+
+
+def parse_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    import dateutil.parser
+    try:
+        return dateutil.parser.parse(value)
+    except (ValueError, OverflowError):
+        abort(400)
+
+
+def venues_query():
+    return in_area(select(
+        Venue.id,
+        Venue.name,
+        genre_names(Venue),
+        Venue.address,
+        Venue.city,
+        Venue.state,
+        Venue.phone,
+        Venue.website_link.label('website'),
+        Venue.facebook_link,
+        Venue.looking_for_talent.label('seeking_talent'),
+        Venue.seeking_description,
+        Venue.image_link,
+    ), Venue).order_by(Venue.id)
+
+
+def artists_query():
+    return in_area(select(
+        Artist.id,
+        Artist.name,
+        genre_names(Artist),
+        Artist.city,
+        Artist.state,
+        Artist.phone,
+        Artist.website_link.label('website'),
+        Artist.facebook_link,
+        Artist.looking_for_venue.label('seeking_venue'),
+        Artist.seeking_description,
+        Artist.image_link,
+    ), Artist).order_by(Artist.id)
+
+
+def shows_query():
+    # ?from=&to= bound start_time (to is exclusive); city/state are the venue's.
+    stmt = in_area(select(
+        Show.id,
+        Show.start_time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+    ).join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id), Venue)
+    start, end = parse_date('from'), parse_date('to')
+    if start is not None:
+        stmt = stmt.where(Show.start_time >= start)
+    if end is not None:
+        stmt = stmt.where(Show.start_time < end)
+    return stmt.order_by(Show.start_time, Show.id)
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    for rows in result.partitions():
+        for row in rows:
+            writer.writerow([_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_lines(result):
+    keys = list(result.keys())
+    for rows in result.partitions():
+        yield ''.join(json.dumps(dict(zip(keys, map(_value, row))), separators=(',', ':')) + '\n'
+                      for row in rows)
+
+
+def stream(stmt, name, fmt):
+    @stream_with_context
+    def generate():
+        result = db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+        try:
+            for chunk in (csv_lines if fmt == 'csv' else ndjson_lines)(result):
+                yield chunk
+        finally:
+            result.close()
+
+    response = Response(generate(), mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = 'attachment; filename={}.{}'.format(name, fmt)
+    return response
+
+
+@export.route('/venues.<any(csv, ndjson):fmt>')
+@response_cache.conditional('venues')
+def venues(fmt):
+    return stream(venues_query(), 'venues', fmt)
+
+
+@export.route('/artists.<any(csv, ndjson):fmt>')
+@response_cache.conditional('artists')
+def artists(fmt):
+    return stream(artists_query(), 'artists', fmt)
+
+
+@export.route('/shows.<any(csv, ndjson):fmt>')
+@response_cache.conditional('shows')
+def shows(fmt):
+    return stream(shows_query(), 'shows', fmt)
@@ -5,14 +5,22 @@ from fabric.contrib.console import confirm
 
 
 def test():
+    # build the assets the app builds at start, then smoke-run every route
+    # against a small synthetic catalog.
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("flask assets build", capture=True)
+        if result.succeeded:
+            result = local(
+                "python benchmark.py --scale tiny --reset --requests 1 --check --strict", capture=True
+            )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def bench():
+    local("python benchmark.py --scale small --output bench.json")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -40,7 +48,7 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python benchmark.py --scale tiny --reset --requests 1 --check"
     )
 
 
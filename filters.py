@@ -0,0 +1,46 @@
+from functools import lru_cache
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+# babel and dateutil are imported on first use: a worker that never renders
+# a date doesn't load their locale data and parser tables at boot.
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def datetime_formatter(format, locale):
+    # parsing the pattern and the locale is most of the cost of a call to
+    # babel.dates.format_datetime; do it once per (format, locale).
+    from babel import Locale
+    from babel.dates import parse_pattern
+    return parse_pattern(DATETIME_FORMATS.get(format, format)), Locale.parse(locale)
+
+
+def format_datetime(value, format='medium', locale='en'):
+    if isinstance(value, str):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    pattern, locale = datetime_formatter(format, locale)
+    return pattern.apply(value, locale)
+
+
+def format_datetimes(values, format='medium', locale='en'):
+    # list pages: format each distinct timestamp once.
+    pattern, locale = datetime_formatter(format, locale)
+    values = list(values)
+    labels = {}
+    for value in values:
+        if value not in labels:
+            labels[value] = pattern.apply(value, locale)
+    return [labels[value] for value in values]
+
+
+def init_app(app):
+    app.jinja_env.filters['datetime'] = format_datetime
+    app.jinja_env.filters['datetimes'] = format_datetimes
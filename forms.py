@@ -1,9 +1,10 @@
 from datetime import datetime
 from xml.dom import ValidationErr
 from flask_wtf import Form, FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL, ValidationError
-import phonenumbers
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, AnyOf, URL, ValidationError, NumberRange
+
+from models import DEFAULT_SHOW_MINUTES, MAX_SHOW_MINUTES
 
 
 class ShowForm(Form):
@@ -18,6 +19,10 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    duration = IntegerField(
+        'duration', validators=[NumberRange(min=1, max=MAX_SHOW_MINUTES)],
+        default=DEFAULT_SHOW_MINUTES
+    )
 
 
 class VenueForm(Form):
@@ -196,6 +201,9 @@ class ArtistForm(Form):
     )
 
     def validate_phone(form, field):
+        # phonenumbers loads its metadata tables on import; only pay for
+        # that once a form is actually validated.
+        import phonenumbers
         number = phonenumbers.parse(field.data)
         if not (phonenumbers.is_valid_number(number)):
             raise ValidationError('Invalid phone number.')
@@ -0,0 +1,172 @@
+import csv
+import json
+import math
+
+from flask import abort, current_app, request
+
+#----------------------------------------------------------------------------#
+# Geography.
+#----------------------------------------------------------------------------#
+
+# Venues carry a latitude/longitude and the geohash of that point. A
+# geohash names a cell of a grid; each extra character splits the cell
+# into 32, and every point in a cell has a hash starting with the cell's.
+# A B-tree over the hashes is therefore a spatial index: the venues in a
+# cell are one range scan.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 12
+# cells searched per query.
+MAX_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# /venues/nearby search radius.
+DEFAULT_RADIUS_KM = 20
+MAX_RADIUS_KM = 500
+DEFAULT_NEARBY = 10
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, value, bits, even = [], 0, 0, True
+    while len(chars) < precision:
+        # bits alternate between longitude and latitude, longitude first.
+        span, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (span[0] + span[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            span[0] = middle
+        else:
+            value *= 2
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            value = bits = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    # (height, width) of a cell, in degrees.
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def box(latitude, longitude, radius_km):
+    """(south, north, west, east) of a box holding every point within
+    radius_km; west > east when it crosses the antimeridian, None when it
+    reaches a pole."""
+    height = radius_km / KM_PER_DEGREE
+    south, north = latitude - height, latitude + height
+    if south <= -90.0 or north >= 90.0:
+        return None
+    width = height / math.cos(math.radians(max(abs(south), abs(north))))
+    if width >= 180.0:
+        return None
+    west = (longitude - width + 180.0) % 360.0 - 180.0
+    east = (longitude + width + 180.0) % 360.0 - 180.0
+    return south, north, west, east
+
+
+def cell_ranges(bounds, max_cells=MAX_CELLS):
+    """[low, high) geohash ranges covering the box, using the smallest
+    cells that need no more than max_cells; None if even the largest
+    cells need more."""
+    south, north, west, east = bounds
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        columns = int(round(360.0 / width))
+        rows = range(int((south + 90.0) // height), int((north + 90.0) // height) + 1)
+        first, last = int((west + 180.0) // width), int((east + 180.0) // width)
+        if last < first:
+            last += columns
+        if len(rows) * (last - first + 1) <= max_cells:
+            break
+    else:
+        return None
+    cells = sorted({encode(-90.0 + (row + 0.5) * height, -180.0 + (column % columns + 0.5) * width, precision)
+                    for row in rows for column in range(first, last + 1)})
+    # neighbouring cells are often adjacent in hash order: one scan each run.
+    ranges = []
+    for cell in cells:
+        low, high = prefix_range(cell)
+        if ranges and ranges[-1][1] == low:
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((low, high))
+    return ranges
+
+
+def prefix_range(prefix):
+    # [low, high) of the hashes starting with prefix; high is None when
+    # the prefix is all 'z's.
+    stripped = prefix.rstrip(BASE32[-1])
+    if not stripped:
+        return prefix, None
+    return prefix, stripped[:-1] + BASE32[BASE32.index(stripped[-1]) + 1]
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    # haversine.
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def nearby_args():
+    """(latitude, longitude, radius_km, limit) from ?lat=&lon=&radius=
+    &limit=; 400 if they are out of range."""
+    latitude = request.args.get('lat', type=float)
+    longitude = request.args.get('lon', type=float)
+    radius = request.args.get('radius', DEFAULT_RADIUS_KM, type=float)
+    limit = request.args.get('limit', DEFAULT_NEARBY, type=int)
+    if (latitude is None or longitude is None or not -90 <= latitude <= 90 or
+            not -180 <= longitude <= 180 or not 0 < radius <= MAX_RADIUS_KM):
+        abort(400)
+    return latitude, longitude, radius, max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+#  Geocoding
+#  ----------------------------------------------------------------
+
+
+def _key(*parts):
+    return tuple(' '.join((part or '').lower().split()) for part in parts)
+
+
+class TableGeocoder(object):
+    """Offline geocoder over a local table (.csv or newline-delimited
+    JSON) with latitude, longitude, city and state columns and an optional
+    address column. Rows with an address geocode that exact address; rows
+    without one are the fallback for the whole city.
+
+    Any object with the same lookup() can stand in for it."""
+
+    def __init__(self, path):
+        self.addresses = {}
+        self.cities = {}
+        for row in self.read(path):
+            point = (float(row['latitude']), float(row['longitude']))
+            if row.get('address'):
+                self.addresses[_key(row['address'], row['city'], row['state'])] = point
+            else:
+                self.cities[_key(row['city'], row['state'])] = point
+
+    @staticmethod
+    def read(path):
+        with open(path, newline='') as f:
+            if path.endswith('.csv'):
+                yield from csv.DictReader(f)
+            else:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def lookup(self, address, city, state):
+        """(latitude, longitude) or None."""
+        point = self.addresses.get(_key(address, city, state))
+        if point is None:
+            point = self.cities.get(_key(city, state))
+        return point
@@ -0,0 +1,80 @@
+from datetime import timezone
+
+from flask import Response, request, url_for
+
+#----------------------------------------------------------------------------#
+# iCalendar feeds.
+#----------------------------------------------------------------------------#
+
+# /venues/<id>/calendar.ics and /artists/<id>/calendar.ics publish a
+# venue's or artist's shows as an RFC 5545 calendar that calendar clients
+# subscribe to and poll. Show times are stored as local wall-clock times
+# and go out as floating times, which clients show unchanged.
+
+PRODID = '-//Fyyur//Shows//EN'
+# octets per line before it is folded.
+LINE_LENGTH = 75
+
+
+def escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def fold(line):
+    # continuation lines start with a space; never split a utf-8 sequence.
+    raw = line.encode('utf8')
+    if len(raw) <= LINE_LENGTH:
+        return line
+    parts, start, limit = [], 0, LINE_LENGTH
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        while end < len(raw) and raw[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode('utf8'))
+        start, limit = end, LINE_LENGTH - 1
+    return '\r\n '.join(parts)
+
+
+def floating(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def utc(value):
+    # naive timestamps are the server's local time.
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def show_event(row):
+    """VEVENT lines for a calendar_query row. The uid is the same in the
+    venue's and the artist's feed, so a client subscribed to both shows
+    the event once."""
+    location = ', '.join(part for part in (row.venue_name, row.address, row.city, row.state) if part)
+    return [
+        'BEGIN:VEVENT',
+        'UID:show-{}@{}'.format(row.id, request.host),
+        'DTSTAMP:' + utc(row.updated_at),
+        'LAST-MODIFIED:' + utc(row.updated_at),
+        'DTSTART:' + floating(row.start_time),
+        'DTEND:' + floating(row.end_time),
+        'SUMMARY:' + escape('{} at {}'.format(row.artist_name, row.venue_name)),
+        'LOCATION:' + escape(location),
+        'URL:' + url_for('venues.show_venue', venue_id=row.venue_id, _external=True),
+        'END:VEVENT',
+    ]
+
+
+def feed(name, rows):
+    """text/calendar response named after the venue or artist, one event
+    per calendar_query row."""
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:' + PRODID,
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:' + escape(name),
+    ]
+    for row in rows:
+        lines.extend(show_event(row))
+    lines.append('END:VCALENDAR')
+    return Response(''.join(fold(line) + '\r\n' for line in lines), mimetype='text/calendar')
@@ -0,0 +1,337 @@
+import csv
+import io
+import json
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from werkzeug.datastructures import MultiDict
+
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, venue_genre, artist_genre, genres_by_name, MAX_SHOW_MINUTES
+from queries import bookings_query
+import show_stats
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# Streams CSV or NDJSON rows, validates each one with the same form the
+# create pages use and loads accepted rows in batches: COPY on postgres,
+# executemany elsewhere. Rejected rows go to a reject file with the form
+# errors. Each batch is committed on its own, so anything that would fail
+# it in the database (a missing venue or artist, a double booking) is
+# checked for the whole batch first and rejected row by row.
+
+FALSE_VALUES = {'', '0', 'f', 'false', 'n', 'no', 'off'}
+
+
+def read_rows(path):
+    # (line number, row dict) for .csv files and newline-delimited JSON.
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield number, json.loads(line)
+
+
+def _formdata(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if key == 'genres':
+            if isinstance(value, str):
+                value = [genre.strip() for genre in value.replace(';', ',').split(',') if genre.strip()]
+            for genre in value or []:
+                data.add(key, genre)
+        elif key.startswith('seeking_') and key != 'seeking_description':
+            if str(value).strip().lower() not in FALSE_VALUES:
+                data.add(key, 'y')
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+class Loader(ABC):
+    model = None
+    form_class = None
+    link = None
+
+    def __init__(self):
+        self.postgres = db.engine.dialect.name == 'postgresql'
+        self.next_id = None
+
+    def validate(self, row):
+        form = self.form_class(formdata=_formdata(row), meta={'csrf': False})
+        try:
+            if form.validate():
+                return form, None
+        except Exception as e:
+            # e.g. phonenumbers rejecting a value outright.
+            return None, {'form': [str(e)]}
+        return None, form.errors
+
+    def check(self, batch):
+        # batch-wide checks on validated forms: one errors dict, or None,
+        # per form.
+        return [None] * len(batch)
+
+    @abstractmethod
+    def values(self, form):
+        # column values of the row a validated form loads.
+        pass
+
+    def reserve_ids(self, count):
+        if self.postgres:
+            return list(db.session.execute(
+                select(func.nextval(func.pg_get_serial_sequence('"{}"'.format(self.model.__tablename__), 'id')))
+                .select_from(func.generate_series(1, count))).scalars())
+        # single writer: hand out ids past the current maximum.
+        if self.next_id is None:
+            self.next_id = (db.session.execute(select(func.max(self.model.id))).scalar() or 0) + 1
+        ids = list(range(self.next_id, self.next_id + count))
+        self.next_id += count
+        return ids
+
+    def load(self, batch):
+        # batch is a list of validated forms.
+        rows = [self.values(form) for form in batch]
+        ids = self.reserve_ids(len(rows))
+        for id, row in zip(ids, rows):
+            row['id'] = id
+        copy_rows(self.model.__table__, rows)
+
+        if self.link is not None:
+            link, key = self.link
+            genres = genres_by_name({name for form in batch for name in form.genres.data})
+            db.session.flush()
+            genre_ids = {genre.name: genre.id for genre in genres}
+            copy_rows(link, [{key: id, 'genre_id': genre_ids[name]}
+                             for id, form in zip(ids, batch)
+                             for name in dict.fromkeys(form.genres.data)])
+        return ids
+
+    def finish(self, ids):
+        # (entity_type, id) pairs whose existing pages the load changed.
+        return []
+
+
+class VenueLoader(Loader):
+    model = Venue
+    form_class = VenueForm
+    link = (venue_genre, 'venue_id')
+
+    def values(self, form):
+        return {
+            'name': form.name.data,
+            'city': form.city.data,
+            'state': form.state.data,
+            'address': form.address.data,
+            'phone': form.phone.data,
+            'facebook_link': form.facebook_link.data,
+            'image_link': form.image_link.data,
+            'website_link': form.website_link.data,
+            'looking_for_talent': form.seeking_talent.data,
+            'seeking_description': form.seeking_description.data,
+        }
+
+
+class ArtistLoader(Loader):
+    model = Artist
+    form_class = ArtistForm
+    link = (artist_genre, 'artist_id')
+
+    def values(self, form):
+        return {
+            'name': form.name.data,
+            'city': form.city.data,
+            'state': form.state.data,
+            'phone': form.phone.data,
+            'facebook_link': form.facebook_link.data,
+            'image_link': form.image_link.data,
+            'website_link': form.website_link.data,
+            'looking_for_venue': form.seeking_venue.data,
+            'seeking_description': form.seeking_description.data,
+        }
+
+
+class ShowLoader(Loader):
+    model = Show
+    form_class = ShowForm
+
+    def __init__(self):
+        super(ShowLoader, self).__init__()
+        self.venue_ids = set()
+        self.artist_ids = set()
+
+    def validate(self, row):
+        form, errors = super(ShowLoader, self).validate(row)
+        if form is not None:
+            try:
+                int(form.artist_id.data)
+                int(form.venue_id.data)
+            except (TypeError, ValueError):
+                return None, {'form': ['artist_id and venue_id must be integers']}
+        return form, errors
+
+    def check(self, batch):
+        # one query per side for the whole batch instead of failing the
+        # batch on a foreign key violation, and one for the bookings it
+        # could clash with instead of an exclusion constraint violation.
+        venue_ids = set(db.session.execute(select(Venue.id).where(
+            Venue.id.in_({int(form.venue_id.data) for form in batch}))).scalars())
+        artist_ids = set(db.session.execute(select(Artist.id).where(
+            Artist.id.in_({int(form.artist_id.data) for form in batch}))).scalars())
+        booked = Bookings()
+        if batch:
+            start = min(form.start_time.data for form in batch)
+            end = max(form.start_time.data + timedelta(minutes=form.duration.data) for form in batch)
+            for row in db.session.execute(bookings_query(venue_ids, artist_ids, start, end)):
+                booked.add(row.venue_id, row.artist_id, row.start_time, row.end_time)
+
+        errors = []
+        for form in batch:
+            venue_id, artist_id = int(form.venue_id.data), int(form.artist_id.data)
+            start = form.start_time.data
+            end = start + timedelta(minutes=form.duration.data)
+            if venue_id not in venue_ids or artist_id not in artist_ids:
+                errors.append({'form': ['unknown venue_id or artist_id']})
+            elif booked.clashes(venue_id, artist_id, start, end):
+                errors.append({'start_time': ['overlaps another show of this venue or artist']})
+            else:
+                # rows later in the batch can clash with this one too.
+                booked.add(venue_id, artist_id, start, end)
+                errors.append(None)
+        return errors
+
+    def values(self, form):
+        return {
+            'artist_id': int(form.artist_id.data),
+            'venue_id': int(form.venue_id.data),
+            'start_time': form.start_time.data,
+            'duration_minutes': form.duration.data,
+        }
+
+    def load(self, batch):
+        self.venue_ids.update(int(form.venue_id.data) for form in batch)
+        self.artist_ids.update(int(form.artist_id.data) for form in batch)
+        return super(ShowLoader, self).load(batch)
+
+    def finish(self, ids):
+        now = datetime.now()
+        show_stats.refresh('venue', sorted(self.venue_ids), now)
+        show_stats.refresh('artist', sorted(self.artist_ids), now)
+        return ([('venue', id) for id in sorted(self.venue_ids)] +
+                [('artist', id) for id in sorted(self.artist_ids)])
+
+
+class Bookings(object):
+    """(start, end) intervals per venue and per artist, sorted by start."""
+
+    def __init__(self):
+        self.intervals = {}
+
+    def add(self, venue_id, artist_id, start, end):
+        for key in (('venue', venue_id), ('artist', artist_id)):
+            insort(self.intervals.setdefault(key, []), (start, end))
+
+    def clashes(self, venue_id, artist_id, start, end):
+        earliest = start - timedelta(minutes=MAX_SHOW_MINUTES)
+        for key in (('venue', venue_id), ('artist', artist_id)):
+            intervals = self.intervals.get(key, [])
+            # only shows starting in (start - longest show, end) can overlap.
+            i = bisect_left(intervals, (end,))
+            while i > 0 and intervals[i - 1][0] > earliest:
+                i -= 1
+                if intervals[i][1] > start:
+                    return True
+        return False
+
+
+LOADERS = {
+    'venues': VenueLoader,
+    'artists': ArtistLoader,
+    'shows': ShowLoader,
+}
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat(' ')
+    return value
+
+
+def copy_rows(table, rows):
+    if not rows:
+        return
+    if db.engine.dialect.name != 'postgresql':
+        db.session.execute(insert(table), rows)
+        return
+
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[column]) for column in columns])
+    buffer.seek(0)
+
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert('COPY "{}" ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        table.name, ', '.join('"{}"'.format(column) for column in columns)), buffer)
+
+
+def import_file(kind, path, rejects_path, batch_size=5000, progress=None):
+    """Load one file; returns (accepted, rejected, touched, seconds)."""
+    loader = LOADERS[kind]()
+    accepted = rejected = 0
+    started = time.perf_counter()
+    ids = []
+
+    with open(rejects_path, 'w') as rejects:
+        def reject(number, row, errors):
+            rejects.write(json.dumps({'line': number, 'row': row, 'errors': errors}, default=str) + '\n')
+
+        def flush(batch):
+            errors = loader.check([form for number, row, form in batch])
+            for (number, row, form), error in zip(batch, errors):
+                if error is not None:
+                    reject(number, row, error)
+            batch = [entry for entry, error in zip(batch, errors) if error is None]
+            ids.extend(loader.load([form for number, row, form in batch]))
+            db.session.commit()
+            return len(batch)
+
+        batch = []
+        for number, row in read_rows(path):
+            form, errors = loader.validate(row)
+            if form is None:
+                reject(number, row, errors)
+                rejected += 1
+                continue
+            batch.append((number, row, form))
+            if len(batch) >= batch_size:
+                done = flush(batch)
+                rejected += len(batch) - done
+                accepted += done
+                batch = []
+                if progress:
+                    progress(accepted, rejected, time.perf_counter() - started)
+        if batch:
+            done = flush(batch)
+            rejected += len(batch) - done
+            accepted += done
+
+    touched = loader.finish(ids)
+    db.session.commit()
+    return accepted, rejected, touched, time.perf_counter() - started
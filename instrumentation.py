@@ -0,0 +1,137 @@
+import json
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+# Counts and times every statement a request executes, reports the totals
+# in a Server-Timing header and a structured log line, and flags statement
+# shapes that repeat within one request (the signature of an N+1 loop).
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN\s*\((?:[^()]*)\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    # parameters are already bound out of the text; also fold inlined
+    # literals and IN lists so a loop over ids maps to one shape.
+    shape = _LITERALS.sub('?', statement)
+    shape = _IN_LISTS.sub('IN (...)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class RequestQueries(object):
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        return shape, self.shapes[shape]
+
+    def repeated(self, threshold):
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+
+class SQLInstrumentation(object):
+
+    def __init__(self, app=None):
+        self.threshold = 10
+        self.strict = False
+        self.requests = 0
+        self.queries = 0
+        self.n_plus_one = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+        self.strict = app.config.get('SQL_N_PLUS_ONE_STRICT', False)
+
+        # engine-wide listeners: registered once however many apps share
+        # this instance.
+        if not event.contains(Engine, 'before_cursor_execute', self._before_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _current(self):
+        return g.get('sql_queries') if has_app_context() else None
+
+    def _start(self):
+        g.sql_queries = RequestQueries()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        queries = self._current()
+        if queries is None:
+            return
+        shape, count = queries.record(statement, elapsed)
+        if self.strict and count > self.threshold:
+            raise NPlusOneError('statement ran {} times in one request: {}'.format(count, shape))
+
+    def _finish(self, response):
+        queries = self._current()
+        if queries is None:
+            return response
+
+        self.requests += 1
+        self.queries += queries.count
+        response.headers.add('Server-Timing', 'db;dur={:.2f};desc="{} queries"'.format(
+            queries.total * 1000, queries.count))
+        if queries.count:
+            response.headers.add('Server-Timing', 'db-slowest;dur={:.2f}'.format(queries.slowest * 1000))
+
+        repeated = queries.repeated(self.threshold)
+        if repeated:
+            self.n_plus_one += 1
+            for shape, count in repeated.items():
+                current_app.logger.warning('possible N+1 on %s: %d x %s', request.endpoint, count, shape)
+
+        current_app.logger.info(json.dumps({
+            "event": "sql",
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "queries": queries.count,
+            "db_ms": round(queries.total * 1000, 2),
+            "slowest_ms": round(queries.slowest * 1000, 2),
+            "slowest": queries.slowest_statement and _SPACES.sub(' ', queries.slowest_statement)[:200],
+        }))
+        return response
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_per_request": self.queries / self.requests if self.requests else 0.0,
+            "n_plus_one_requests": self.n_plus_one,
+        }
@@ -0,0 +1,31 @@
+from sqlalchemy import select
+
+from models import db, Show
+from cache import response_cache
+
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#----------------------------------------------------------------------------#
+
+# Pages are cached under tags: 'venues', 'artists' and 'shows' for the
+# listings, 'venue:<id>' and 'artist:<id>' for detail pages. Detail pages
+# also show the names and images of the other side of each show. The
+# listing tags also version the name-search results and n-gram indexes.
+
+
+def venue_changed(venue_id):
+    artist_ids = db.session.execute(
+        select(Show.artist_id).where(Show.venue_id == venue_id).distinct()).scalars()
+    response_cache.invalidate('venues', 'shows', 'venue:%s' % venue_id,
+                              *['artist:%s' % id for id in artist_ids])
+
+
+def artist_changed(artist_id):
+    venue_ids = db.session.execute(
+        select(Show.venue_id).where(Show.artist_id == artist_id).distinct()).scalars()
+    response_cache.invalidate('artists', 'shows', 'artist:%s' % artist_id,
+                              *['venue:%s' % id for id in venue_ids])
+
+
+def show_changed(venue_id, artist_id):
+    response_cache.invalidate('venues', 'artists', 'shows', 'venue:%s' % venue_id, 'artist:%s' % artist_id)
@@ -0,0 +1,34 @@
+"""show and name indexes
+
+Revision ID: 3c9d1e7a52f0
+Revises: 743b8aef4511
+Create Date: 2026-10-18 09:12:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d1e7a52f0'
+down_revision = '743b8aef4511'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_start_time', 'Show', ['start_time'], unique=False)
+    op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city'], unique=False)
+    op.create_index('ix_Venue_name_lower', 'Venue', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_Artist_name_lower', 'Artist', [sa.text('lower(name)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_lower', table_name='Artist')
+    op.drop_index('ix_Venue_name_lower', table_name='Venue')
+    op.drop_index('ix_Venue_state_city', table_name='Venue')
+    op.drop_index('ix_Show_start_time', table_name='Show')
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
@@ -0,0 +1,32 @@
+"""btree indexes in listing order for venues and artists
+
+Revision ID: 5b1f0d8e3c62
+Revises: e4b7c9a05f18
+Create Date: 2026-10-18 19:02:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1f0d8e3c62'
+down_revision = 'e4b7c9a05f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keyset pages are `(keys) > (cursor) ORDER BY keys LIMIT n`: with the
+    # whole key indexed, one range scan instead of a sort of the table.
+    op.drop_index('ix_Venue_state_city', table_name='Venue')
+    op.create_index('ix_Venue_state_city_name_id', 'Venue', ['state', 'city', 'name', 'id'], unique=False)
+    op.create_index('ix_Venue_name_id', 'Venue', ['name', 'id'], unique=False)
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
+    op.drop_index('ix_Venue_name_id', table_name='Venue')
+    op.drop_index('ix_Venue_state_city_name_id', table_name='Venue')
+    op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city'], unique=False)
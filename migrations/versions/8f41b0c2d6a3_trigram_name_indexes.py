@@ -0,0 +1,32 @@
+"""trigram name indexes
+
+Revision ID: 8f41b0c2d6a3
+Revises: 3c9d1e7a52f0
+Create Date: 2026-10-18 10:03:17.502944
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f41b0c2d6a3'
+down_revision = '3c9d1e7a52f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GIN trigram indexes let postgres serve name ILIKE '%term%' and
+    # similarity() ranking; other databases get a plain index.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Artist_name_trgm', 'Artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
@@ -0,0 +1,38 @@
+"""updated_at on venues, artists and shows
+
+Revision ID: a6e2f48c1d93
+Revises: f3a91c6d2e57
+Create Date: 2026-10-18 16:40:27.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e2f48c1d93'
+down_revision = 'f3a91c6d2e57'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('Venue', 'Artist', 'Show')
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for table in TABLES:
+        if postgres:
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                           server_default=sa.text('CURRENT_TIMESTAMP')))
+            continue
+        # SQLite only adds NOT NULL columns with a constant default, and a
+        # batch rebuild of the tables would drop their expression indexes.
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default='1970-01-01 00:00:00'))
+        op.execute('UPDATE "{}" SET updated_at = CURRENT_TIMESTAMP'.format(table))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,124 @@
+"""normalize genres
+
+Revision ID: b52e7f9a1c84
+Revises: 8f41b0c2d6a3
+Create Date: 2026-10-18 11:26:05.730511
+
+"""
+import csv
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52e7f9a1c84'
+down_revision = '8f41b0c2d6a3'
+branch_labels = None
+depends_on = None
+
+
+genre_table = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+
+def parse_genres(value):
+    # The old columns hold whatever the multi-select list was stringified
+    # to: a postgres array literal ({Jazz,"Rock n Roll"}), a python list
+    # repr (['Jazz', 'Rock n Roll']) or a plain comma separated list.
+    value = (value or '').strip().strip('{}[]')
+    names = next(csv.reader([value], skipinitialspace=True), [])
+    return [name.strip().strip('\'"').strip() for name in names if name.strip().strip('\'"').strip()]
+
+
+def _move_genres(bind, owner, link, key):
+    rows = bind.execute(sa.text('SELECT id, genres FROM "{}"'.format(owner))).fetchall()
+    genre_ids = dict(bind.execute(sa.text('SELECT name, id FROM "Genre"')).fetchall())
+    links = []
+    for id, genres in rows:
+        for name in dict.fromkeys(parse_genres(genres)):
+            if name not in genre_ids:
+                bind.execute(genre_table.insert().values(name=name))
+                genre_ids[name] = bind.execute(
+                    sa.text('SELECT id FROM "Genre" WHERE name = :name'), {'name': name}).scalar()
+            links.append({key: id, 'genre_id': genre_ids[name]})
+    if links:
+        op.bulk_insert(sa.table(link, sa.column(key, sa.Integer), sa.column('genre_id', sa.Integer)), links)
+
+
+def _restore_genres(bind, owner, link, key):
+    rows = bind.execute(sa.text(
+        'SELECT l.{key}, g.name FROM {link} l JOIN "Genre" g ON g.id = l.genre_id '
+        'ORDER BY l.{key}, g.name'.format(key=key, link=link))).fetchall()
+    genres = {}
+    for id, name in rows:
+        genres.setdefault(id, []).append(name)
+    for id, names in genres.items():
+        bind.execute(sa.text('UPDATE "{}" SET genres = :genres WHERE id = :id'.format(owner)),
+                     {'genres': ','.join(names), 'id': id})
+
+
+def _restore_name_indexes():
+    # a batch rebuild on SQLite only carries over the indexes it can
+    # reflect, which leaves out the lower(name) expression indexes.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.create_index('ix_Venue_name_lower', 'Venue', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_Artist_name_lower', 'Artist', [sa.text('lower(name)')], unique=False)
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('venue_genre',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genre_genre_id_venue_id', 'venue_genre', ['genre_id', 'venue_id'], unique=False)
+    op.create_table('artist_genre',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genre_genre_id_artist_id', 'artist_genre', ['genre_id', 'artist_id'], unique=False)
+
+    bind = op.get_bind()
+    _move_genres(bind, 'Venue', 'venue_genre', 'venue_id')
+    _move_genres(bind, 'Artist', 'artist_genre', 'artist_id')
+
+    with op.batch_alter_table('Venue') as batch_op:
+        batch_op.drop_column('genres')
+    with op.batch_alter_table('Artist') as batch_op:
+        batch_op.drop_column('genres')
+    _restore_name_indexes()
+
+
+def downgrade():
+    op.add_column('Venue', sa.Column('genres', sa.String(length=120), nullable=True))
+    op.add_column('Artist', sa.Column('genres', sa.String(length=120), nullable=True))
+
+    bind = op.get_bind()
+    _restore_genres(bind, 'Venue', 'venue_genre', 'venue_id')
+    _restore_genres(bind, 'Artist', 'artist_genre', 'artist_id')
+    op.execute('UPDATE "Venue" SET genres = \'\' WHERE genres IS NULL')
+    op.execute('UPDATE "Artist" SET genres = \'\' WHERE genres IS NULL')
+
+    with op.batch_alter_table('Venue') as batch_op:
+        batch_op.alter_column('genres', existing_type=sa.String(length=120), nullable=False)
+    with op.batch_alter_table('Artist') as batch_op:
+        batch_op.alter_column('genres', existing_type=sa.String(length=120), nullable=False)
+    _restore_name_indexes()
+
+    op.drop_index('ix_artist_genre_genre_id_artist_id', table_name='artist_genre')
+    op.drop_table('artist_genre')
+    op.drop_index('ix_venue_genre_genre_id_venue_id', table_name='venue_genre')
+    op.drop_table('venue_genre')
+    op.drop_table('Genre')
@@ -0,0 +1,44 @@
+"""venue coordinates, geohash and location indexes
+
+Revision ID: c81f5d2a7b46
+Revises: a6e2f48c1d93
+Create Date: 2026-10-18 17:25:53.640218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f5d2a7b46'
+down_revision = 'a6e2f48c1d93'
+branch_labels = None
+depends_on = None
+
+
+POINT = 'geography(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326))'
+
+
+def postgis_available(bind):
+    return bind.dialect.name == 'postgresql' and bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'postgis'")).first() is not None
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index('ix_Venue_geohash', 'Venue', ['geohash', 'latitude', 'longitude'], unique=False)
+
+    # without PostGIS, /venues/nearby searches the geohash index instead.
+    if postgis_available(op.get_bind()):
+        op.execute('CREATE EXTENSION IF NOT EXISTS postgis')
+        op.execute('CREATE INDEX "ix_Venue_location_gist" ON "Venue" USING gist (({}))'.format(POINT))
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS "ix_Venue_location_gist"')
+    op.drop_index('ix_Venue_geohash', table_name='Venue')
+    op.drop_column('Venue', 'geohash')
+    op.drop_column('Venue', 'longitude')
+    op.drop_column('Venue', 'latitude')
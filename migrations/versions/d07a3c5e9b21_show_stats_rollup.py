@@ -0,0 +1,51 @@
+"""show_stats rollup
+
+Revision ID: d07a3c5e9b21
+Revises: b52e7f9a1c84
+Create Date: 2026-10-18 12:41:52.093317
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd07a3c5e9b21'
+down_revision = 'b52e7f9a1c84'
+branch_labels = None
+depends_on = None
+
+
+BACKFILL = """
+INSERT INTO show_stats (entity_type, entity_id, upcoming_count, past_count, next_show_at)
+SELECT '{type}', {key},
+       COUNT(CASE WHEN start_time > :now THEN 1 END),
+       COUNT(CASE WHEN start_time <= :now THEN 1 END),
+       MIN(CASE WHEN start_time > :now THEN start_time END)
+FROM "Show" GROUP BY {key}
+"""
+
+
+def upgrade():
+    op.create_table('show_stats',
+    sa.Column('entity_type', sa.String(length=10), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('upcoming_count', sa.Integer(), nullable=False),
+    sa.Column('past_count', sa.Integer(), nullable=False),
+    sa.Column('next_show_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('entity_type', 'entity_id')
+    )
+    op.create_index(op.f('ix_show_stats_next_show_at'), 'show_stats', ['next_show_at'], unique=False)
+
+    bind = op.get_bind()
+    now = datetime.now()
+    for type, key in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        bind.execute(sa.text(BACKFILL.format(type=type, key=key)).bindparams(
+            sa.bindparam('now', now, type_=sa.DateTime())))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_show_stats_next_show_at'), table_name='show_stats')
+    op.drop_table('show_stats')
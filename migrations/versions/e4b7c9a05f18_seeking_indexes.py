@@ -0,0 +1,28 @@
+"""partial indexes for the availability search
+
+Revision ID: e4b7c9a05f18
+Revises: c81f5d2a7b46
+Create Date: 2026-10-18 18:06:12.514730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c9a05f18'
+down_revision = 'c81f5d2a7b46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_seeking', 'Venue', ['state', 'city', 'name', 'id'], unique=False,
+                    postgresql_where=sa.text('looking_for_talent'), sqlite_where=sa.text('looking_for_talent = 1'))
+    op.create_index('ix_Artist_seeking', 'Artist', ['name', 'id'], unique=False,
+                    postgresql_where=sa.text('looking_for_venue'), sqlite_where=sa.text('looking_for_venue = 1'))
+
+
+def downgrade():
+    op.drop_index('ix_Artist_seeking', table_name='Artist')
+    op.drop_index('ix_Venue_seeking', table_name='Venue')
@@ -0,0 +1,59 @@
+"""show duration and booking conflicts
+
+Revision ID: f3a91c6d2e57
+Revises: d07a3c5e9b21
+Create Date: 2026-10-18 14:02:11.380526
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a91c6d2e57'
+down_revision = 'd07a3c5e9b21'
+branch_labels = None
+depends_on = None
+
+
+PERIOD = "tsrange(start_time, start_time + duration_minutes * interval '1 minute')"
+
+OVERLAPS = """
+SELECT count(*) FROM "Show" a JOIN "Show" b
+  ON a.id < b.id AND a.{key} = b.{key}
+ AND tsrange(a.start_time, a.start_time + a.duration_minutes * interval '1 minute')
+  && tsrange(b.start_time, b.start_time + b.duration_minutes * interval '1 minute')
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.add_column(sa.Column('duration_minutes', sa.Integer(), server_default='120', nullable=False))
+        batch_op.create_check_constraint('ck_Show_duration_minutes',
+                                         'duration_minutes > 0 AND duration_minutes <= 1440')
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # existing double bookings would make the constraints fail to build;
+    # report them instead of picking which show to drop.
+    for key in ('venue_id', 'artist_id'):
+        overlapping = bind.execute(sa.text(OVERLAPS.format(key=key))).scalar()
+        if overlapping:
+            raise RuntimeError('{} pairs of shows overlap on the same {}; resolve them before '
+                               'upgrading'.format(overlapping, key))
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for key in ('venue_id', 'artist_id'):
+        op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{key}_period" '
+                   'EXCLUDE USING gist ({key} WITH =, {period} WITH &&)'.format(key=key, period=PERIOD))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('ex_Show_artist_id_period', 'Show')
+        op.drop_constraint('ex_Show_venue_id_period', 'Show')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_constraint('ck_Show_duration_minutes', type_='check')
+        batch_op.drop_column('duration_minutes')
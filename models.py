@@ -1,13 +1,60 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
 
-app = Flask(__name__)
-db = SQLAlchemy(app)
+from routing import RoutingSQLAlchemy
+
+# bound to an app by create_app().
+db = RoutingSQLAlchemy()
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+# show length when none is given, and the longest booking accepted.
+DEFAULT_SHOW_MINUTES = 120
+MAX_SHOW_MINUTES = 24 * 60
+
+
+def updated_at_column():
+    # bumped by every ORM/Core update; {% cache %} keys on listing pages
+    # include it. The server default covers rows loaded with COPY.
+    return db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                     server_default=db.text('CURRENT_TIMESTAMP'))
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+
+# (genre_id, entity_id) indexes serve the "by genre" listings; the primary
+# keys serve loading one entity's genres.
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_venue_genre_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genre = db.Table(
+    'artist_genre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_artist_genre_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+
+def genres_by_name(names):
+    # Genre rows for the given names, creating the ones that don't exist yet.
+    names = list(dict.fromkeys(names))
+    genres = {genre.name: genre for genre in Genre.query.filter(Genre.name.in_(names))}
+    for name in names:
+        if name not in genres:
+            genres[name] = Genre(name=name)
+            db.session.add(genres[name])
+    return [genres[name] for name in names]
+
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
@@ -18,14 +65,36 @@ class Venue(db.Model):
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=venue_genre, order_by='Genre.name')
     facebook_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(200))
     looking_for_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
+    # set by `flask geocode`; geohash is the point's 12-character geohash.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))
+    updated_at = updated_at_column()
     shows = db.relationship('Show', backref='venue', lazy=True)
 
+    __table_args__ = (
+        # listing orders (VENUE_ORDER, and by name), so keyset pages are
+        # range scans.
+        db.Index('ix_Venue_state_city_name_id', 'state', 'city', 'name', 'id'),
+        db.Index('ix_Venue_name_id', 'name', 'id'),
+        # venues looking for talent, in listing order: the availability search.
+        # SQLite only uses a partial index whose condition is spelled the way
+        # queries spell it, `looking_for_talent = 1`.
+        db.Index('ix_Venue_seeking', 'state', 'city', 'name', 'id',
+                 postgresql_where=looking_for_talent, sqlite_where=looking_for_talent == True),
+        # covering the coordinates, so the box check needs no table lookups.
+        db.Index('ix_Venue_geohash', 'geohash', 'latitude', 'longitude'),
+        db.Index('ix_Venue_name_lower', db.func.lower(name)),
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 
@@ -37,14 +106,25 @@ class Artist(db.Model):
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=artist_genre, order_by='Genre.name')
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website_link = db.Column(db.String(200))
     looking_for_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
+    updated_at = updated_at_column()
     shows = db.relationship('Show', backref='artist', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_Artist_name_lower', db.func.lower(name)),
+        # ARTIST_ORDER, so keyset pages are range scans.
+        db.Index('ix_Artist_name_id', 'name', 'id'),
+        db.Index('ix_Artist_seeking', 'name', 'id',
+                 postgresql_where=looking_for_venue, sqlite_where=looking_for_venue == True),
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 
@@ -55,5 +135,62 @@ class Show(db.Model):
         'Artist.id'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=DEFAULT_SHOW_MINUTES,
+                                 server_default=str(DEFAULT_SHOW_MINUTES))
+    updated_at = updated_at_column()
+
+    # detail pages filter on (venue_id|artist_id, start_time); /shows
+    # orders by start_time alone.
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time', 'start_time'),
+        db.CheckConstraint('duration_minutes > 0 AND duration_minutes <= {}'.format(MAX_SHOW_MINUTES),
+                           name='ck_Show_duration_minutes'),
+    )
+
+
+# On postgres a venue or an artist can't be booked for two overlapping
+# shows: exclusion constraints over (id, period), each backed by a GiST
+# index (btree_gist supplies the integer equality). Overlap queries use
+# the same period expression so they are served by those indexes.
+SHOW_PERIOD_SQL = "tsrange(start_time, start_time + duration_minutes * interval '1 minute')"
+
+for key in ('venue_id', 'artist_id'):
+    db.event.listen(Show.__table__, 'after_create', db.DDL(
+        'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{key}_period" '
+        'EXCLUDE USING gist ({key} WITH =, {period} WITH &&)'.format(key=key, period=SHOW_PERIOD_SQL)
+    ).execute_if(dialect='postgresql'))
+db.event.listen(Show.__table__, 'before_create',
+                db.DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
+
+# Where PostGIS is installed, venue locations also get a GiST index over
+# their geography, which serves /venues/nearby's k-nearest-neighbour
+# ordering. The geohash index is the fallback everywhere else.
+VENUE_POINT_SQL = 'geography(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326))'
+
+
+def postgis_available(ddl, target, bind, **kw):
+    return bind.dialect.name == 'postgresql' and bind.execute(db.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'postgis'")).first() is not None
+
+
+db.event.listen(Venue.__table__, 'before_create',
+                db.DDL('CREATE EXTENSION IF NOT EXISTS postgis').execute_if(callable_=postgis_available))
+db.event.listen(Venue.__table__, 'after_create', db.DDL(
+    'CREATE INDEX "ix_Venue_location_gist" ON "Venue" USING gist (({}))'.format(VENUE_POINT_SQL)
+).execute_if(callable_=postgis_available))
 
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+
+class ShowStats(db.Model):
+    # Per-venue and per-artist show counts, kept up to date as shows are
+    # created and rolled from upcoming to past by `flask show-stats roll`.
+    __tablename__ = 'show_stats'
+
+    entity_type = db.Column(db.String(10), primary_key=True)
+    entity_id = db.Column(db.Integer, primary_key=True)
+    upcoming_count = db.Column(db.Integer, nullable=False, default=0)
+    past_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_at = db.Column(db.DateTime, index=True)
@@ -0,0 +1,84 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import literal, tuple_
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+# Pages are addressed by an opaque cursor holding the sort key of the last
+# row served, so page N costs one index range scan like page one.
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_dump(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, keys):
+    # 400 unless the token holds one value of the right type per key: a
+    # forged cursor must not reach the driver.
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            abort(400)
+        values = [_load(v) for v in values]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        abort(400)
+    for key, value in zip(keys, values):
+        expected = key.type.python_type
+        if value is not None and (isinstance(value, bool) or not isinstance(value, expected)):
+            abort(400)
+    return values
+
+
+def page_size():
+    default = current_app.config['PAGE_SIZE']
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+
+def page_statement(stmt, keys):
+    # keys must be selected by stmt and together be unique (end with id).
+    # Returns the statement for the requested page and the page size; it
+    # fetches one extra row to tell whether a next page exists.
+    size = page_size()
+    cursor = request.args.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        stmt = stmt.where(tuple_(*keys) > tuple_(
+            *[literal(value, key.type) for key, value in zip(keys, values)]))
+    return stmt.order_by(*keys).limit(size + 1), size
+
+
+def page_rows(rows, keys, size):
+    # the page rows and the cursor of the next page, if any.
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor([rows[-1]._mapping[key] for key in keys])
+    return rows, next_cursor
+
+
+def paginate(stmt, keys):
+    stmt, size = page_statement(stmt, keys)
+    return page_rows(db.session.execute(stmt).all(), keys, size)
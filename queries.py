@@ -0,0 +1,376 @@
+from datetime import timedelta
+from itertools import groupby
+
+from sqlalchemy import DateTime, String, and_, cast, func, literal, literal_column, or_, select, text, type_coerce
+
+from models import db, Venue, Artist, Show, ShowStats, Genre, venue_genre, artist_genre, MAX_SHOW_MINUTES
+import geo
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+# Statements are built here as 2.0-style selects and executed by the
+# routes, so every page issues a known, fixed number of round trips.
+
+
+ENTITY_TYPES = {
+    Venue: 'venue',
+    Artist: 'artist',
+}
+
+
+def stats_of(model):
+    # join condition from a Venue/Artist select to its show_stats row.
+    return and_(ShowStats.entity_type == ENTITY_TYPES[model], ShowStats.entity_id == model.id)
+
+
+def num_upcoming_shows():
+    return func.coalesce(ShowStats.upcoming_count, 0).label('num_upcoming_shows')
+
+
+def venue_areas_query():
+    return select(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.updated_at,
+        num_upcoming_shows()
+    ).outerjoin(ShowStats, stats_of(Venue))
+
+
+GENRE_LINKS = {
+    Venue: (venue_genre, venue_genre.c.venue_id),
+    Artist: (artist_genre, artist_genre.c.artist_id),
+}
+
+
+def in_genre(stmt, model, genre):
+    # restrict a Venue/Artist select to one genre through the association
+    # table's (genre_id, entity_id) index.
+    link, key = GENRE_LINKS[model]
+    return stmt.join(link, key == model.id).join(
+        Genre, Genre.id == link.c.genre_id).where(Genre.name == genre)
+
+
+def shows_query():
+    # only the columns the show tiles render, and the updated_at of each
+    # row they come from for the tile's cache key.
+    return select(
+        Show.id,
+        Show.start_time,
+        Show.updated_at,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.updated_at.label('venue_updated_at'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Artist.updated_at.label('artist_updated_at'),
+    ).join(Artist, Artist.id == Show.artist_id).join(Venue, Venue.id == Show.venue_id)
+
+
+def show_tile(row):
+    return {
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+        "start_time": row.start_time
+    }
+
+
+def venue_shows_query(venue_id):
+    return select(
+        Show.start_time,
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+    ).join(Artist, Artist.id == Show.artist_id).where(
+        Show.venue_id == venue_id
+    ).order_by(Show.start_time, Show.id)
+
+
+def artist_shows_query(artist_id):
+    return select(
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+    ).join(Venue, Venue.id == Show.venue_id).where(
+        Show.artist_id == artist_id
+    ).order_by(Show.start_time, Show.id)
+
+
+def calendar_query(model, entity_id, since):
+    # a venue's or artist's shows from `since` on, with what a calendar
+    # event needs from both sides.
+    return select(
+        Show.id,
+        Show.start_time,
+        show_end().label('end_time'),
+        Show.updated_at,
+        Artist.name.label('artist_name'),
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.address,
+        Venue.city,
+        Venue.state,
+    ).join(Artist, Artist.id == Show.artist_id).join(Venue, Venue.id == Show.venue_id).where(
+        SHOW_KEYS[model] == entity_id, Show.start_time >= since
+    ).order_by(Show.start_time, Show.id)
+
+
+def split_shows(rows, now):
+    # (past, upcoming) tile dicts, split against one request timestamp.
+    past, upcoming = [], []
+    for row in rows:
+        (past if row.start_time < now else upcoming).append(dict(row._mapping))
+    return past, upcoming
+
+
+def _next_show_at(rows, now):
+    return next((row.start_time for row in rows if row.start_time >= now), None)
+
+
+def venue_detail(venue_id, now):
+    # (page data, start of the next show) for one venue, in two queries;
+    # (None, None) if there is no such venue.
+    venue = db.session.get(Venue, venue_id)
+    if venue is None:
+        return None, None
+    return venue_data(venue, db.session.execute(venue_shows_query(venue_id)).all(), now)
+
+
+def venue_data(venue, shows, now):
+    # venue_shows_query rows; shared with the async detail view.
+    past_shows, upcoming_shows = split_shows(shows, now)
+
+    data = {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": [genre.name for genre in venue.genres],
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.looking_for_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows)
+    }
+    return data, _next_show_at(shows, now)
+
+
+def artist_detail(artist_id, now):
+    artist = db.session.get(Artist, artist_id)
+    if artist is None:
+        return None, None
+    return artist_data(artist, db.session.execute(artist_shows_query(artist_id)).all(), now)
+
+
+def artist_data(artist, shows, now):
+    past_shows, upcoming_shows = split_shows(shows, now)
+
+    data = {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": [genre.name for genre in artist.genres],
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.looking_for_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows)
+    }
+    return data, _next_show_at(shows, now)
+
+
+def show_end():
+    if db.engine.dialect.name == 'postgresql':
+        return type_coerce(Show.start_time + Show.duration_minutes * literal_column("interval '1 minute'"),
+                           DateTime)
+    return func.datetime(Show.start_time, literal('+') + cast(Show.duration_minutes, String) + ' minutes',
+                         type_=DateTime)
+
+
+def overlaps(start, end):
+    # shows whose [start_time, end) intersects [start, end).
+    if db.engine.dialect.name == 'postgresql':
+        # the expression of the exclusion constraints, so their GiST
+        # indexes serve it.
+        return func.tsrange(Show.start_time, show_end()).op('&&')(func.tsrange(start, end))
+    # bounded below by the longest possible show, so the
+    # (venue_id|artist_id, start_time) indexes limit the scan.
+    return and_(Show.start_time < end,
+                Show.start_time > start - timedelta(minutes=MAX_SHOW_MINUTES),
+                show_end() > start)
+
+
+def conflicts_query(venue_id, artist_id, start, end):
+    # shows that booking this venue and artist for [start, end) would clash with.
+    return select(
+        Show.id,
+        Show.venue_id,
+        Show.artist_id,
+        Show.start_time,
+        show_end().label('end_time'),
+    ).where(or_(Show.venue_id == venue_id, Show.artist_id == artist_id), overlaps(start, end)
+            ).order_by(Show.start_time, Show.id)
+
+
+def bookings_query(venue_ids, artist_ids, start, end):
+    # shows of any of these venues or artists intersecting [start, end):
+    # what a batch of new bookings in that span could clash with.
+    return select(
+        Show.venue_id,
+        Show.artist_id,
+        Show.start_time,
+        show_end().label('end_time'),
+    ).where(or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)), overlaps(start, end))
+
+
+SEEKING = {
+    Venue: Venue.looking_for_talent,
+    Artist: Artist.looking_for_venue,
+}
+
+SHOW_KEYS = {
+    Venue: Show.venue_id,
+    Artist: Show.artist_id,
+}
+
+
+def available_query(model, start, end, genre=None):
+    # venues/artists looking for bookings with no show overlapping
+    # [start, end). Candidates are read off the seeking partial index in
+    # listing order; the NOT EXISTS anti-join costs each one probe of the
+    # (venue_id|artist_id, start_time) index, or of the exclusion
+    # constraint's GiST index on postgres. A page stops at its last row.
+    busy = select(Show.id).where(SHOW_KEYS[model] == model.id, overlaps(start, end))
+    stmt = select(model.id, model.name, model.city, model.state).where(SEEKING[model], ~busy.exists())
+    if genre:
+        # a semi-join rather than in_genre()'s join, so the scan stays on
+        # the seeking index in page order instead of sorting the whole genre.
+        link, key = GENRE_LINKS[model]
+        stmt = stmt.where(select(link.c.genre_id).join(Genre, Genre.id == link.c.genre_id).where(
+            key == model.id, Genre.name == genre).exists())
+    return stmt
+
+
+# listing order; areas are contiguous runs of (state, city).
+VENUE_ORDER = (Venue.state, Venue.city, Venue.name, Venue.id)
+ARTIST_ORDER = (Artist.name, Artist.id)
+SHOW_ORDER = (Show.start_time, Show.id)
+
+
+def group_areas(rows):
+    # rows must be ordered by (state, city); one pass, no extra queries.
+    return [{
+        "city": city,
+        "state": state,
+        "venues": [{
+            "id": row.id,
+            "name": row.name,
+            "updated_at": row.updated_at,
+            "num_upcoming_shows": row.num_upcoming_shows,
+        } for row in area_rows]
+    } for (state, city), area_rows in groupby(rows, key=lambda row: (row.state, row.city))]
+
+
+#  Nearby venues
+#  ----------------------------------------------------------------
+
+# the geohash search looks this far first, and twice as far each time it
+# finds too few venues.
+NEARBY_START_KM = 1.0
+
+# engine url -> whether the PostGIS location index exists.
+_location_index = {}
+
+
+def has_location_index():
+    engine = db.session.connection().engine
+    if engine.dialect.name != 'postgresql':
+        return False
+    key = str(engine.url)
+    if key not in _location_index:
+        _location_index[key] = db.session.execute(text(
+            "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_Venue_location_gist'")).first() is not None
+    return _location_index[key]
+
+
+def nearby_columns():
+    return (Venue.id, Venue.name, Venue.city, Venue.state, Venue.latitude, Venue.longitude)
+
+
+def venue_point():
+    # the expression of the GiST index, so the planner uses it.
+    return func.geography(func.ST_SetSRID(func.ST_MakePoint(Venue.longitude, Venue.latitude),
+                                          literal_column('4326')))
+
+
+def postgis_nearby_query(latitude, longitude, radius_km, limit):
+    point = func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), literal_column('4326')))
+    return select(
+        *nearby_columns(),
+        (func.ST_Distance(venue_point(), point) / 1000).label('distance_km'),
+    ).where(func.ST_DWithin(venue_point(), point, radius_km * 1000)
+            ).order_by(venue_point().op('<->')(point)).limit(limit)
+
+
+def box_query(latitude, longitude, radius_km):
+    # venues in the box around the point: one index range scan per run of
+    # geohash cells, then the box itself drops rows outside it before they
+    # are sent.
+    bounds = geo.box(latitude, longitude, radius_km)
+    if bounds is None:
+        # a polar cap: every longitude.
+        band = radius_km / geo.KM_PER_DEGREE
+        return select(*nearby_columns()).where(Venue.latitude.between(latitude - band, latitude + band))
+    south, north, west, east = bounds
+    stmt = select(*nearby_columns()).where(Venue.latitude.between(south, north))
+    if west <= east:
+        stmt = stmt.where(Venue.longitude.between(west, east))
+    else:
+        stmt = stmt.where(or_(Venue.longitude >= west, Venue.longitude <= east))
+    ranges = geo.cell_ranges(bounds)
+    if ranges is not None:
+        stmt = stmt.where(or_(*[Venue.geohash >= low if high is None else Venue.geohash.between(low, high)
+                                for low, high in ranges]))
+    return stmt
+
+
+def venues_near(latitude, longitude, radius_km, limit):
+    """Up to limit venues within radius_km of the point, nearest first,
+    as (distance_km, row) pairs."""
+    if has_location_index():
+        rows = db.session.execute(postgis_nearby_query(latitude, longitude, radius_km, limit)).all()
+        return [(row.distance_km, row) for row in rows]
+
+    # every venue within `reach` is in its box, so once there are limit of
+    # them they are the nearest; otherwise look twice as far.
+    reach = min(radius_km, NEARBY_START_KM)
+    while True:
+        found = []
+        for row in db.session.execute(box_query(latitude, longitude, reach)):
+            distance = geo.distance_km(latitude, longitude, row.latitude, row.longitude)
+            if distance <= reach:
+                found.append((distance, row))
+        if len(found) >= limit or reach >= radius_km:
+            found.sort(key=lambda pair: (pair[0], pair[1].id))
+            return found[:limit]
+        reach = min(radius_km, reach * 2)
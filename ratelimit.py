@@ -0,0 +1,95 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from werkzeug.exceptions import TooManyRequests
+
+#----------------------------------------------------------------------------#
+# Rate limiting.
+#----------------------------------------------------------------------------#
+
+# Each client gets a token bucket per limited group of routes: it holds up
+# to <NAME>_RATE_BURST tokens, refills at <NAME>_RATE_LIMIT tokens a second,
+# and every request spends one. A client with an empty bucket gets a 429
+# and a Retry-After for when its next token is due. Buckets are kept in
+# process, per worker, for the most recently seen RATE_LIMIT_MAX_CLIENTS
+# clients.
+
+
+class TokenBuckets(object):
+    """Token buckets of one group, keyed by client, and their counters."""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+        self.allowed = 0
+        self.throttled = 0
+
+    def take(self, client):
+        # 0 if the request may go ahead, otherwise seconds until it may.
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.clients.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+                self.allowed += 1
+            else:
+                wait = (1 - tokens) / self.rate
+                self.throttled += 1
+            self.clients[client] = (tokens, now)
+            while len(self.clients) > self.max_clients:
+                self.clients.popitem(last=False)
+        return wait
+
+    def stats(self):
+        return {
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+            "clients": len(self.clients),
+        }
+
+
+def buckets(name):
+    # the app's buckets for a group, made on first use; None when the
+    # group isn't limited.
+    app = current_app._get_current_object()
+    groups = app.extensions['rate_limits']
+    if name not in groups:
+        rate = app.config.get(name.upper() + '_RATE_LIMIT', 0)
+        burst = app.config.get(name.upper() + '_RATE_BURST', 0) or max(1, rate)
+        groups.setdefault(name, TokenBuckets(rate, burst, app.config['RATE_LIMIT_MAX_CLIENTS']) if rate > 0 else None)
+    return groups[name]
+
+
+def limit(name):
+    """Rate-limit a view under <NAME>_RATE_LIMIT and <NAME>_RATE_BURST,
+    per client address."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            group = buckets(name)
+            if group is not None:
+                wait = group.take(request.remote_addr)
+                if wait:
+                    raise TooManyRequests(retry_after=math.ceil(wait))
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stats():
+    return {name: group.stats() for name, group in current_app.extensions['rate_limits'].items()
+            if group is not None}
+
+
+def init_app(app):
+    app.config.setdefault('RATE_LIMIT_MAX_CLIENTS', 10000)
+    app.extensions['rate_limits'] = {}
@@ -0,0 +1,66 @@
+from functools import wraps
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+
+#----------------------------------------------------------------------------#
+# Read replica routing.
+#----------------------------------------------------------------------------#
+
+# With a 'replica' bind configured, the session sends the queries of views
+# marked read-only to the replica. Writes, flushes, and everything outside
+# such a view use the primary. A client that has just made a write request
+# gets a short-lived cookie that keeps its reads on the primary, so it
+# sees its own change despite replication lag.
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'read_primary'
+
+
+def use_replica():
+    # also usable as a blueprint before_request hook.
+    g.read_only = True
+    g.use_replica = STICKY_COOKIE not in request.cookies
+
+
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        use_replica()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+        if (not self._flushing and has_app_context() and g.get('use_replica')
+                and REPLICA in (self.app.config.get('SQLALCHEMY_BINDS') or {})):
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA)
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def init_app(self, app):
+        super(RoutingSQLAlchemy, self).init_app(app)
+        app.after_request(self._stick_to_primary)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def _stick_to_primary(self, response):
+        app = self.get_app()
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS') and not g.get('read_only')
+                and app.config.get('SQLALCHEMY_BINDS', {}).get(REPLICA)):
+            response.set_cookie(STICKY_COOKIE, '1', max_age=app.config.get('REPLICA_STICKY_SECONDS', 5),
+                                httponly=True, samesite='Lax')
+        return response
+
+    def pool_status(self):
+        app = self.get_app()
+        engines = {'primary': self.get_engine(app)}
+        if REPLICA in (app.config.get('SQLALCHEMY_BINDS') or {}):
+            engines[REPLICA] = self.get_engine(app, bind=REPLICA)
+        return {name: engine.pool.status() for name, engine in engines.items()}
@@ -0,0 +1,254 @@
+import hashlib
+import re
+import threading
+
+from flask import current_app
+from sqlalchemy import func, literal, select
+
+from models import db, ShowStats
+from queries import ENTITY_TYPES, stats_of, num_upcoming_shows
+from cache import LRUCache, SharedCache, response_cache
+
+#----------------------------------------------------------------------------#
+# Name search.
+#----------------------------------------------------------------------------#
+
+# Postgres answers searches with one ranked query that the pg_trgm GIN
+# indexes on Venue.name/Artist.name can serve. Other databases (SQLite in
+# development) fall back to a per-app n-gram index over the names, rebuilt
+# when the version of the 'venues' or 'artists' tag moves.
+#
+# A promoted term arrives thousands of times in a few seconds. Results are
+# kept for SEARCH_CACHE_TTL seconds under the current versions of the
+# listing tags, so an edit is visible at once; while a term's query is
+# running, identical searches wait for it and share its result instead of
+# issuing their own.
+
+
+def escape_like(term):
+    return re.sub(r'([\\%_])', r'\\\1', term)
+
+
+def _words(text):
+    return re.findall(r'[0-9a-z]+', text.lower())
+
+
+def trigrams(text):
+    # same padding rules as pg_trgm, so ranks match the postgres backend.
+    grams = set()
+    for word in _words(text):
+        padded = '  ' + word + ' '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    a, b = trigrams(a), trigrams(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _ngrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NgramIndex(object):
+    """Substring index over (id, name) of one model, built at a version of
+    its listing tag."""
+
+    def __init__(self, model):
+        self.model = model
+        self.names = None
+        self.postings = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _build(self):
+        names = {}
+        postings = {}
+        rows = db.session.execute(select(self.model.id, self.model.name))
+        for id, name in rows:
+            names[id] = name
+            for gram in _ngrams(name.lower()):
+                postings.setdefault(gram, set()).add(id)
+        self.names = names
+        self.postings = postings
+
+    def match(self, term, version):
+        with self.lock:
+            if self.names is None or self.version != version:
+                self._build()
+                self.version = version
+            names, postings = self.names, self.postings
+
+        needle = term.lower()
+        grams = _ngrams(needle)
+        if grams:
+            candidates = set.intersection(*(postings.get(g, set()) for g in grams))
+        else:
+            # too short for a trigram; scan every name.
+            candidates = names.keys()
+
+        hits = [(id, names[id]) for id in candidates if needle in names[id].lower()]
+        hits.sort(key=lambda hit: (-similarity(hit[1], term), hit[1], hit[0]))
+        return hits
+
+
+def _search_postgres(model, term):
+    rank = func.similarity(model.name, literal(term))
+
+    rows = db.session.execute(
+        select(
+            model.id,
+            model.name,
+            num_upcoming_shows(),
+            func.count().over().label('total'),
+        ).outerjoin(ShowStats, stats_of(model)).where(
+            model.name.ilike('%' + escape_like(term) + '%', escape='\\')
+        ).order_by(rank.desc(), model.name, model.id)
+    ).all()
+
+    return {
+        "count": rows[0].total if rows else 0,
+        "data": [{
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.num_upcoming_shows,
+        } for row in rows]
+    }
+
+
+def _search_ngram(model, term):
+    version, = response_cache.backend.get_counters([ENTITY_TYPES[model] + 's'])
+    hits = current_app.extensions['search'].indexes[model].match(term, version)
+
+    counts = {}
+    if hits:
+        counts = dict(db.session.execute(
+            select(ShowStats.entity_id, ShowStats.upcoming_count).where(
+                ShowStats.entity_type == ENTITY_TYPES[model],
+                ShowStats.entity_id.in_([id for id, name in hits]))
+        ).all())
+
+    return {
+        "count": len(hits),
+        "data": [{
+            "id": id,
+            "name": name,
+            "num_upcoming_shows": counts.get(id, 0),
+        } for id, name in hits]
+    }
+
+
+def _search(model, term):
+    # relevance-ranked matches plus the total count and upcoming-show
+    # counts, fetched in a single round trip.
+    if db.engine.dialect.name == 'postgresql':
+        return _search_postgres(model, term)
+    return _search_ngram(model, term)
+
+
+def search(model, term):
+    hot = current_app.extensions['search']
+    if current_app.config['SEARCH_CACHE_TTL'] <= 0:
+        return _search(model, term)
+    # matching is case-insensitive, so 'hop' and 'Hop' share an entry.
+    tags = [ENTITY_TYPES[model] + 's', 'shows']
+    versions = response_cache.backend.get_counters(tags)
+    key = 'search:{}:{}:{}'.format(ENTITY_TYPES[model], ':'.join(map(str, versions)),
+                                   hashlib.sha1(term.lower().encode('utf8')).hexdigest())
+    result = hot.backend.get(key)
+    if result is not None:
+        hot.hits += 1
+        return result
+    hot.misses += 1
+
+    def run():
+        # a search that missed just before the last leader stored its
+        # result finds it here.
+        result = hot.backend.get(key)
+        if result is None:
+            hot.queries += 1
+            result = _search(model, term)
+            hot.backend.set(key, result, current_app.config['SEARCH_CACHE_TTL'])
+        return result
+    return hot.flight.do(key, run)
+
+#  Hot searches
+#  ----------------------------------------------------------------
+
+
+class SingleFlight(object):
+    """One call per key at a time: callers that arrive while a key's call
+    is running wait for it and get its result, or its exception."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class HotSearch(object):
+    """Per-app search result store, single-flight group, n-gram indexes
+    and counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.indexes = {model: NgramIndex(model) for model in ENTITY_TYPES}
+        self.flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "cached": self.hits,
+            "coalesced": self.flight.coalesced,
+            "queries": self.queries,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def init_app(app):
+    app.config.setdefault('SEARCH_CACHE_TTL', 10)
+    url = app.config.get('CACHE_REDIS_URL')
+    if url:
+        import redis
+        backend = SharedCache(redis.Redis.from_url(url))
+    else:
+        backend = LRUCache(app.config.get('SEARCH_CACHE_MAX_ENTRIES', 1024))
+    app.extensions['search'] = HotSearch(backend)
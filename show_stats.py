@@ -0,0 +1,89 @@
+from sqlalchemy import case, delete, func, insert, literal, select
+
+from models import db, Show, ShowStats
+
+#----------------------------------------------------------------------------#
+# Show statistics rollup.
+#----------------------------------------------------------------------------#
+
+# show_stats holds upcoming/past counts and the next show time for every
+# venue and artist that has shows. Creating a show updates the two rows it
+# affects in the same transaction; `roll` moves shows that have started
+# since the last run from upcoming to past.
+
+ENTITY_KEYS = {
+    'venue': Show.venue_id,
+    'artist': Show.artist_id,
+}
+
+BATCH_SIZE = 1000
+
+
+def _bump(entity_type, entity_id, start_time, now):
+    stats = db.session.get(ShowStats, (entity_type, entity_id))
+    upcoming = start_time > now
+
+    if stats is None:
+        db.session.add(ShowStats(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            upcoming_count=1 if upcoming else 0,
+            past_count=0 if upcoming else 1,
+            next_show_at=start_time if upcoming else None,
+        ))
+    elif upcoming:
+        stats.upcoming_count = ShowStats.upcoming_count + 1
+        if stats.next_show_at is None or start_time < stats.next_show_at:
+            stats.next_show_at = start_time
+    else:
+        stats.past_count = ShowStats.past_count + 1
+
+
+def record_show(show, now):
+    _bump('venue', int(show.venue_id), show.start_time, now)
+    _bump('artist', int(show.artist_id), show.start_time, now)
+
+
+def _stats_select(entity_type, now):
+    key = ENTITY_KEYS[entity_type]
+    return select(
+        literal(entity_type),
+        key,
+        func.count(case((Show.start_time > now, 1))),
+        func.count(case((Show.start_time <= now, 1))),
+        func.min(case((Show.start_time > now, Show.start_time))),
+    ).group_by(key)
+
+
+STATS_COLUMNS = ['entity_type', 'entity_id', 'upcoming_count', 'past_count', 'next_show_at']
+
+
+def refresh(entity_type, ids, now):
+    # Recompute the rows of the given entities from the Show table, using
+    # the (venue_id|artist_id, start_time) indexes.
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        db.session.execute(delete(ShowStats).where(
+            ShowStats.entity_type == entity_type, ShowStats.entity_id.in_(batch)))
+        db.session.execute(insert(ShowStats).from_select(
+            STATS_COLUMNS,
+            _stats_select(entity_type, now).where(ENTITY_KEYS[entity_type].in_(batch))))
+
+
+def roll(now):
+    # Refresh every entity whose next show has started. Returns the
+    # (entity_type, entity_id) pairs that changed.
+    due = db.session.execute(
+        select(ShowStats.entity_type, ShowStats.entity_id).where(ShowStats.next_show_at <= now)
+    ).all()
+    for entity_type in ENTITY_KEYS:
+        refresh(entity_type, [id for type, id in due if type == entity_type], now)
+    return due
+
+
+def rebuild(now):
+    db.session.execute(delete(ShowStats))
+    for entity_type in ENTITY_KEYS:
+        db.session.execute(insert(ShowStats).from_select(
+            STATS_COLUMNS, _stats_select(entity_type, now)))
@@ -0,0 +1,107 @@
+import traceback
+from datetime import datetime, timedelta
+
+from flask import Blueprint, render_template, request, flash
+from sqlalchemy.exc import IntegrityError
+
+from forms import ShowForm
+from models import db, Show
+from queries import shows_query, conflicts_query, SHOW_ORDER
+from pagination import paginate
+from cache import response_cache
+from routing import read_only
+from filters import format_datetime
+from invalidation import show_changed
+import show_stats
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+shows = Blueprint('shows', __name__)
+
+
+@shows.route('/shows')
+@read_only
+@response_cache.cached('shows')
+def index():
+    # displays list of shows at /shows
+    # TODO: replace with real venues data.
+
+    # rows go to the template as they are: the tiles' cache keys use their
+    # updated_at columns, which show_tile() keeps out of the API.
+    shows, next_cursor = paginate(shows_query(), SHOW_ORDER)
+
+    return render_template('pages/shows.html', shows=shows, next_cursor=next_cursor)
+
+
+@shows.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+def booking_conflicts(form):
+    # one message per show the new booking would overlap; one query.
+    try:
+        venue_id, artist_id = int(form.venue_id.data), int(form.artist_id.data)
+    except (TypeError, ValueError):
+        return []
+    start = form.start_time.data
+    if start is None or not form.duration.data:
+        return []
+    end = start + timedelta(minutes=form.duration.data)
+    return ['{} is already booked from {} to {}.'.format(
+        'The venue' if show.venue_id == venue_id else 'The artist',
+        format_datetime(show.start_time, 'full'), format_datetime(show.end_time, 'full'))
+        for show in db.session.execute(conflicts_query(venue_id, artist_id, start, end))]
+
+
+@shows.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    # TODO: insert form data as a new Show record in the db, instead
+    form = ShowForm(request.form)
+
+    conflicts = booking_conflicts(form)
+    if conflicts:
+        form.start_time.errors = conflicts
+        flash('Show could not be listed: the time overlaps another booking.')
+        return render_template('forms/new_show.html', form=form), 409
+
+    try:
+        show = Show(
+            artist_id=form.artist_id.data,
+            venue_id=form.venue_id.data,
+            start_time=form.start_time.data,
+            duration_minutes=form.duration.data
+        )
+
+        db.session.add(show)
+        show_stats.record_show(show, datetime.now())
+        db.session.commit()
+        show_changed(show.venue_id, show.artist_id)
+    # on successful db insert, flash success
+        flash('Show was successfully listed!')
+    except IntegrityError as e:
+        db.session.rollback()
+        # lost a race with another booking; the exclusion constraints
+        # caught it.
+        if 'ex_Show_' in str(e.orig):
+            form.start_time.errors = ['The venue or artist was booked for this time in the meantime.']
+            flash('Show could not be listed: the time overlaps another booking.')
+            return render_template('forms/new_show.html', form=form), 409
+        flash('An error occured. Show could not be listed.')
+        traceback.print_exc()
+    except:
+        db.session.rollback()
+
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Show could not be listed.')
+        flash('An error occured. Show could not be listed.')
+        traceback.print_exc()
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
@@ -0,0 +1,101 @@
+import hashlib
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import LRUCache, SharedCache
+
+#----------------------------------------------------------------------------#
+# Template caching.
+#----------------------------------------------------------------------------#
+
+# Compiled templates go to a FileSystemBytecodeCache: every worker, and
+# every restart, loads the bytecode instead of compiling the source again.
+# Entries are keyed by template name and a checksum of its source, so an
+# edited template is recompiled.
+#
+# {% cache key, ttl %}...{% endcache %} stores the rendered body of a
+# block. Keys carry the ids and updated_at of what the block renders, so a
+# change to any of them makes a new key and stale fragments are never read
+# again; the ttl (seconds, CACHE_DEFAULT_TTL if left out) only bounds how
+# long unused ones are kept. Fragments live in their own store, in-process
+# or in redis next to the page cache, so the thousands of tiles a listing
+# holds don't evict whole pages.
+
+
+class FragmentCache(object):
+    """Per-app fragment store and its hit counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class CacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        # a block's keys are namespaced by its template, line and source, so
+        # the same key in two blocks, or a block whose markup was edited,
+        # can't return the other's fragment.
+        block = nodes.Const('{}:{}:{}'.format(parser.name, lineno, self._source_digest(parser.name)))
+        return nodes.CallBlock(self.call_method('_render', [block] + args), [], [], body).set_lineno(lineno)
+
+    def _source_digest(self, name):
+        if name is None or self.environment.loader is None:
+            return ''
+        source = self.environment.loader.get_source(self.environment, name)[0]
+        return hashlib.sha1(source.encode('utf8')).hexdigest()[:12]
+
+    def _render(self, block, key, ttl, caller):
+        app = current_app._get_current_object()
+        if ttl is None:
+            ttl = app.config['CACHE_DEFAULT_TTL']
+        if not app.config['FRAGMENT_CACHE'] or ttl <= 0:
+            return caller()
+        fragments = app.extensions['fragment_cache']
+        key = 'fragment:' + hashlib.sha1(repr((block, key)).encode('utf8')).hexdigest()
+        value = fragments.backend.get(key)
+        if value is not None:
+            fragments.hits += 1
+            return Markup(value)
+        fragments.misses += 1
+        value = caller()
+        fragments.backend.set(key, str(value), ttl)
+        return value
+
+
+def init_app(app):
+    app.config.setdefault('CACHE_DEFAULT_TTL', 300)
+    app.config.setdefault('FRAGMENT_CACHE', True)
+    if app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+        # with no directory given, jinja picks a private per-user one under
+        # the system temp dir.
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config.get('TEMPLATE_BYTECODE_CACHE_DIR'))
+
+    url = app.config.get('CACHE_REDIS_URL')
+    if url:
+        import redis
+        backend = SharedCache(redis.Redis.from_url(url))
+    else:
+        backend = LRUCache(app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 20000))
+    app.extensions['fragment_cache'] = FragmentCache(backend)
+    app.jinja_env.add_extension(CacheExtension)
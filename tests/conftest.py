@@ -0,0 +1,114 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from cache import SharedCache
+from app import create_app
+import datagen
+
+#----------------------------------------------------------------------------#
+# Fixtures.
+#----------------------------------------------------------------------------#
+
+# Each catalog is a SQLite file under pytest's temp dir, filled by datagen
+# once per session. Caches are off so every request reaches the database.
+
+
+def make_app(path, migrations=False, **settings):
+    url = 'sqlite:///' + str(path)
+    values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    values.update({
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': config.engine_options(url),
+        'SQLALCHEMY_BINDS': {},
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'CACHE_DEFAULT_TTL': 0,
+        'FRAGMENT_CACHE': False,
+        'TEMPLATE_BYTECODE_CACHE': False,
+        'ASSETS_BUILD_ON_START': False,
+        'SEARCH_CACHE_TTL': 0,
+        'SEARCH_RATE_LIMIT': 0,
+        'SQL_N_PLUS_ONE_STRICT': True,
+    }, **settings)
+    return create_app(type('TestConfig', (), values), migrations=migrations)
+
+
+def seed(app, scale):
+    with app.app_context():
+        datagen.reset()
+        datagen.generate(scale, seed=42)
+    return app
+
+
+@pytest.fixture(scope='session')
+def catalog(tmp_path_factory):
+    """catalog(scale) -> app over a generated catalog of that scale, shared
+    by the session; tests must not write to it."""
+    apps = {}
+
+    def build(scale):
+        if scale not in apps:
+            apps[scale] = seed(make_app(tmp_path_factory.mktemp(scale) / 'catalog.db'), scale)
+        return apps[scale]
+    return build
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """workers(n, **settings) -> n apps over one fresh tiny catalog, each
+    with its own in-process caches, like the workers of one server."""
+    def build(count, **settings):
+        path = tmp_path / 'catalog.db'
+        apps = [make_app(path, **settings) for i in range(count)]
+        seed(apps[0], 'tiny')
+        return apps
+    return build
+
+
+@pytest.fixture
+def unmigrated(tmp_path):
+    """An app with Flask-Migrate over an empty database, for running the
+    migrations themselves."""
+    return make_app(tmp_path / 'migrated.db', migrations=True)
+
+
+@pytest.fixture
+def client(catalog):
+    return catalog('tiny').test_client()
+
+
+class Store(object):
+    """Dict with the slice of the redis client API SharedCache uses."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+
+@pytest.fixture
+def share():
+    """share(*apps) -> apps, now with one page cache between them, as with
+    CACHE_REDIS_URL."""
+    def attach(*apps):
+        backend = SharedCache(Store())
+        for app in apps:
+            app.extensions['response_cache'] = backend
+        return apps
+    return attach
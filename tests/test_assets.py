@@ -0,0 +1,56 @@
+import os
+import shutil
+
+from flask import Flask
+
+import assets
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+def make_app(static_folder, **settings):
+    app = Flask(__name__, static_folder=static_folder)
+    app.config.update(settings)
+    assets.init_app(app)
+    app.register_blueprint(assets.assets)
+    return app
+
+
+def copy_static(tmp_path):
+    folder = str(tmp_path / 'static')
+    shutil.copytree(STATIC, folder, ignore=shutil.ignore_patterns(assets.DIST))
+    return folder
+
+
+def test_start_builds_missing_assets(tmp_path):
+    folder = copy_static(tmp_path)
+    app = make_app(folder)
+    assert set(app.extensions['assets']) == set(assets.BUNDLES) | set(assets.FILES)
+    assert not [name for name in os.listdir(os.path.join(folder, assets.DIST)) if name.endswith('.tmp')]
+    with app.test_request_context():
+        url = assets.asset_url('main.css')
+    assert url.startswith('/static/dist/main.')
+    response = app.test_client().get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == assets.IMMUTABLE
+
+
+def test_start_rebuilds_stale_assets(tmp_path):
+    folder = copy_static(tmp_path)
+    before = make_app(folder).extensions['assets']['main.css']
+    source = os.path.join(folder, 'css', 'main.css')
+    with open(source, 'a') as f:
+        f.write('\n.stale { color: red; }\n')
+    built = os.path.getmtime(os.path.join(folder, assets.DIST, assets.MANIFEST))
+    os.utime(source, (built + 1, built + 1))
+    assert assets.stale(folder)
+    assert make_app(folder).extensions['assets']['main.css'] != before
+
+
+def test_no_build_in_debug_or_when_off(tmp_path):
+    folder = copy_static(tmp_path)
+    for app in (make_app(folder, DEBUG=True), make_app(folder, ASSETS_BUILD_ON_START=False)):
+        assert app.extensions['assets'] == {}
+        with app.test_request_context():
+            assert assets.asset_url('main.css') == '/assets/main.css'
+    assert not os.path.exists(os.path.join(folder, assets.DIST))
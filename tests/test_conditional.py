@@ -0,0 +1,75 @@
+from invalidation import venue_changed
+from models import db, Venue
+
+
+def rename_venue(app, venue_id, name):
+    # what the edit route does: write, then bump the venue's tags.
+    with app.test_request_context():
+        db.session.get(Venue, venue_id).name = name
+        db.session.commit()
+        venue_changed(venue_id)
+
+
+def queries(response):
+    return int(response.headers['Server-Timing'].split('desc="')[1].split()[0])
+
+
+def test_in_process_validators_follow_other_workers_writes(workers):
+    a, b = workers(2)
+    first = b.test_client().get('/api/v1/venues/1')
+    assert first.headers.get('Last-Modified') is None
+    assert b.test_client().get('/api/v1/venues/1', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    rename_venue(a, 1, 'Renamed Hall')
+    again = b.test_client().get('/api/v1/venues/1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 200
+    assert again.get_json()['name'] == 'Renamed Hall'
+
+
+def test_shared_validators_revalidate_without_queries(workers, share):
+    a, b = share(*workers(2))
+
+    first = b.test_client().get('/api/v1/venues/1')
+    poll = b.test_client().get('/api/v1/venues/1', headers={'If-None-Match': first.headers['ETag']})
+    assert poll.status_code == 304
+    assert queries(poll) == 0
+
+    rename_venue(a, 1, 'Renamed Hall')
+    poll = b.test_client().get('/api/v1/venues/1', headers={'If-None-Match': first.headers['ETag']})
+    assert poll.status_code == 200
+    assert poll.get_json()['name'] == 'Renamed Hall'
+    assert poll.headers['Last-Modified'] is not None
+
+
+def test_in_process_calendar_is_not_kept_past_other_workers_writes(workers):
+    a, b = workers(2, CACHE_DEFAULT_TTL=300)
+    feed = b.test_client().get('/venues/1/calendar.ics')
+    assert feed.status_code == 200
+
+    rename_venue(a, 1, 'Renamed Hall')
+    poll = b.test_client().get('/venues/1/calendar.ics', headers={'If-None-Match': feed.headers['ETag']})
+    assert poll.status_code == 200
+    assert 'X-WR-CALNAME:Renamed Hall' in poll.get_data(as_text=True)
+
+
+def test_shared_calendar_is_kept_until_a_write(workers, share):
+    a, b = share(*workers(2))
+
+    feed = b.test_client().get('/venues/1/calendar.ics')
+    again = b.test_client().get('/venues/1/calendar.ics')
+    assert again.headers['X-Cache'] == 'HIT'
+    assert queries(again) == 0
+
+    rename_venue(a, 1, 'Renamed Hall')
+    poll = b.test_client().get('/venues/1/calendar.ics', headers={'If-None-Match': feed.headers['ETag']})
+    assert poll.status_code == 200
+    assert 'X-WR-CALNAME:Renamed Hall' in poll.get_data(as_text=True)
+
+
+def test_in_process_exports_stay_streamed(workers):
+    app, = workers(1)
+    response = app.test_client().get('/export/venues.csv')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'ETag' not in response.headers
+    assert response.get_data(as_text=True).startswith('id,')
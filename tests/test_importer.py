@@ -0,0 +1,70 @@
+import json
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from models import db, Show
+import importer
+
+
+def write_ndjson(path, rows):
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    return str(path)
+
+
+def rejected_lines(path):
+    with open(path) as f:
+        return {entry['line']: entry['errors'] for entry in map(json.loads, f)}
+
+
+def test_loader_needs_values():
+    class Incomplete(importer.Loader):
+        pass
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_show_rows_with_unknown_references_are_rejected(workers, tmp_path):
+    app, = workers(1)
+    path = write_ndjson(tmp_path / 'shows.ndjson', [
+        {'venue_id': 1, 'artist_id': 1, 'start_time': '2040-01-01 20:00:00'},
+        {'venue_id': 999999, 'artist_id': 1, 'start_time': '2040-01-02 20:00:00'},
+        {'venue_id': 1, 'artist_id': 999999, 'start_time': '2040-01-03 20:00:00'},
+        {'venue_id': 2, 'artist_id': 2, 'start_time': '2040-01-04 20:00:00'},
+    ])
+    with app.app_context():
+        before = db.session.execute(select(func.count(Show.id))).scalar()
+        accepted, rejected, touched, seconds = importer.import_file('shows', path, path + '.rejects', batch_size=3)
+        assert (accepted, rejected) == (2, 2)
+        assert db.session.execute(select(func.count(Show.id))).scalar() == before + 2
+    assert set(rejected_lines(path + '.rejects')) == {2, 3}
+
+
+def test_show_rows_that_double_book_are_rejected(workers, tmp_path):
+    app, = workers(1)
+    with app.app_context():
+        show = db.session.execute(select(Show).order_by(Show.id)).scalars().first()
+        venue_id, artist_id, start = show.venue_id, show.artist_id, show.start_time
+        duration = timedelta(minutes=show.duration_minutes)
+        before = db.session.execute(select(func.count(Show.id))).scalar()
+    # a venue and an artist with no shows at all in the year 2040.
+    later = start.replace(year=2040)
+    path = write_ndjson(tmp_path / 'shows.ndjson', [
+        # same venue, overlapping the existing show.
+        {'venue_id': venue_id, 'artist_id': 1 if artist_id != 1 else 2, 'start_time': str(start),
+         'duration': 30},
+        # same artist, overlapping it at another venue.
+        {'venue_id': 1 if venue_id != 1 else 2, 'artist_id': artist_id,
+         'start_time': str(start + duration / 2)},
+        # a booking, then one overlapping it in the same batch, then one
+        # right after it.
+        {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': str(later), 'duration': 60},
+        {'venue_id': venue_id, 'artist_id': 3, 'start_time': str(later + timedelta(minutes=30))},
+        {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': str(later + timedelta(minutes=60))},
+    ])
+    with app.app_context():
+        accepted, rejected, touched, seconds = importer.import_file('shows', path, path + '.rejects')
+        assert (accepted, rejected) == (2, 3)
+        assert db.session.execute(select(func.count(Show.id))).scalar() == before + 2
+    assert set(rejected_lines(path + '.rejects')) == {1, 2, 4}
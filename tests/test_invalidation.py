@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+
+def listed(client, url, id):
+    rows = client.get(url + '?limit=200').get_json()['data']
+    return next(row for row in rows if row['id'] == id)
+
+
+def test_new_show_refreshes_both_listings(workers):
+    app, = workers(1, CACHE_DEFAULT_TTL=300)
+    client = app.test_client()
+    venue = listed(client, '/api/v1/venues', 1)['num_upcoming_shows']
+    artist = listed(client, '/api/v1/artists', 1)['num_upcoming_shows']
+    assert client.get('/api/v1/artists?limit=200').headers['X-Cache'] == 'HIT'
+
+    # far enough ahead to clash with nothing the generator booked.
+    start = (datetime.now() + timedelta(days=3650)).strftime('%Y-%m-%d %H:%M:%S')
+    client.post('/shows/create', data={'venue_id': 1, 'artist_id': 1, 'start_time': start, 'duration': 60})
+
+    assert listed(client, '/api/v1/venues', 1)['num_upcoming_shows'] == venue + 1
+    assert listed(client, '/api/v1/artists', 1)['num_upcoming_shows'] == artist + 1
+    assert client.get('/api/v1/artists/1').get_json()['upcoming_shows_count'] == artist + 1
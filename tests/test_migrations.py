@@ -0,0 +1,28 @@
+import os
+
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import inspect
+
+from models import db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def index_names(table):
+    # reflection leaves out expression indexes; sqlite_master has them all.
+    return {name for name, in db.session.execute(db.text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+        {'table': table})}
+
+
+def test_upgrade_creates_every_model_index(unmigrated):
+    with unmigrated.app_context():
+        upgrade(directory=MIGRATIONS)
+        for table in db.metadata.sorted_tables:
+            assert {index.name for index in table.indexes} <= index_names(table.name), table.name
+
+        # undoing the genre move rebuilds the tables again.
+        downgrade(directory=MIGRATIONS, revision='8f41b0c2d6a3')
+        assert 'genres' in {column['name'] for column in inspect(db.engine).get_columns('Venue')}
+        assert {'ix_Venue_name_lower'} <= index_names('Venue')
+        assert {'ix_Artist_name_lower'} <= index_names('Artist')
@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+
+def cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('url, values', [
+    # well-formed cursors whose values don't match the sort keys' types.
+    ('/shows', ['x', 1]),
+    ('/shows', [{'dt': datetime(2030, 1, 1).isoformat()}, 'x']),
+    ('/artists', ['Band', 'x']),
+    ('/artists', [1, 1]),
+    ('/artists', ['Band', True]),
+    ('/venues', ['CA', 'San Francisco', 'Hall', {'dt': '2030-01-01T00:00:00'}]),
+    ('/api/v1/venues', [1, 2, 3, 4]),
+    ('/api/v1/artists', {'name': 'Band'}),
+])
+def test_cursor_with_wrong_types_is_rejected(client, url, values):
+    assert client.get(url, query_string={'cursor': cursor(values)}).status_code == 400
+
+
+@pytest.mark.parametrize('token', ['%%%', cursor(['Band']), cursor('Band'), cursor({'dt': 5})])
+def test_malformed_cursor_is_rejected(client, token):
+    assert client.get('/artists', query_string={'cursor': token}).status_code == 400
+
+
+@pytest.mark.parametrize('url', ['/api/v1/venues', '/api/v1/artists', '/api/v1/shows'])
+def test_next_cursor_round_trips(client, url):
+    # page 2 starts right after page 1: the two are the first ten rows.
+    first = client.get(url, query_string={'limit': 5}).get_json()
+    following = client.get(url, query_string={'limit': 5, 'cursor': first['next_cursor']})
+    assert following.status_code == 200
+    both = client.get(url, query_string={'limit': 10}).get_json()
+    assert first['data'] + following.get_json()['data'] == both['data']
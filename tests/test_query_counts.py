@@ -0,0 +1,39 @@
+import pytest
+
+#----------------------------------------------------------------------------#
+# Listing and detail pages issue a fixed number of statements, whatever
+# the size of the catalog or the page.
+#----------------------------------------------------------------------------#
+
+PAGES = {
+    '/venues': 1,
+    '/venues/genres/Jazz': 1,
+    '/artists': 1,
+    '/artists/genres/Jazz': 1,
+    '/shows': 1,
+    '/venues/7': 3,
+    '/artists/7': 3,
+    '/api/v1/venues': 1,
+    '/api/v1/artists': 1,
+    '/api/v1/shows': 1,
+}
+
+
+def queries(response):
+    # SQLInstrumentation reports the request's count in Server-Timing.
+    return int(response.headers['Server-Timing'].split('desc="')[1].split()[0])
+
+
+@pytest.mark.parametrize('url', sorted(PAGES))
+@pytest.mark.parametrize('scale', ['tiny', 'small'])
+def test_query_count_is_constant(catalog, scale, url):
+    response = catalog(scale).test_client().get(url)
+    assert response.status_code == 200
+    assert queries(response) == PAGES[url]
+
+
+@pytest.mark.parametrize('url', ['/venues', '/artists', '/shows'])
+def test_query_count_does_not_grow_with_page_size(catalog, url):
+    client = catalog('small').test_client()
+    counts = {queries(client.get(url, query_string={'limit': limit})) for limit in (1, 50, 200)}
+    assert counts == {PAGES[url]}
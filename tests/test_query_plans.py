@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select, text
+
+from models import db, Venue, Artist
+from queries import (venue_areas_query, shows_query, venue_shows_query, artist_shows_query, conflicts_query,
+                     available_query, VENUE_ORDER, ARTIST_ORDER, SHOW_ORDER)
+
+#----------------------------------------------------------------------------#
+# The indexed access paths are the ones SQLite actually plans: each
+# statement must search or scan the named indexes, and only those that
+# merge two index searches may sort (the few rows they find).
+#----------------------------------------------------------------------------#
+
+NOW = datetime(2030, 1, 1, 20)
+
+PLANS = {
+    # filters
+    'venue shows': (lambda: venue_shows_query(7), ['SEARCH Show USING INDEX ix_Show_venue_id_start_time']),
+    'artist shows': (lambda: artist_shows_query(7), ['SEARCH Show USING INDEX ix_Show_artist_id_start_time']),
+    'venues in a city': (lambda: select(Venue.id).where(Venue.state == 'CA', Venue.city == 'San Francisco'),
+                         ['SEARCH Venue USING COVERING INDEX ix_Venue_state_city_name_id (state=? AND city=?)']),
+    'venue by name': (lambda: select(Venue.id).where(func.lower(Venue.name) == 'the musical hop'),
+                      ['SEARCH Venue USING INDEX ix_Venue_name_lower (<expr>=?)']),
+    'artist by name': (lambda: select(Artist.id).where(func.lower(Artist.name) == 'guns n petals'),
+                       ['SEARCH Artist USING INDEX ix_Artist_name_lower (<expr>=?)']),
+    'booking conflicts': (lambda: conflicts_query(7, 7, NOW, NOW.replace(hour=22)),
+                          ['SEARCH Show USING INDEX ix_Show_venue_id_start_time (venue_id=? AND start_time>? '
+                           'AND start_time<?)',
+                           'SEARCH Show USING INDEX ix_Show_artist_id_start_time (artist_id=? AND start_time>? '
+                           'AND start_time<?)'], True),
+    # orders
+    'venue listing': (lambda: venue_areas_query().order_by(*VENUE_ORDER).limit(51),
+                      ['SCAN Venue USING INDEX ix_Venue_state_city_name_id']),
+    'artist listing': (lambda: select(Artist.id, Artist.name).order_by(*ARTIST_ORDER).limit(51),
+                       ['SCAN Artist USING COVERING INDEX']),
+    'available artists': (lambda: available_query(Artist, NOW, NOW.replace(hour=22)).order_by(*ARTIST_ORDER),
+                          ['SCAN Artist USING INDEX ix_Artist_seeking',
+                           'SEARCH Show USING INDEX ix_Show_artist_id_start_time']),
+    # joins
+    'show listing': (lambda: shows_query().order_by(*SHOW_ORDER).limit(51),
+                     ['SCAN Show USING INDEX ix_Show_start_time',
+                      'SEARCH Artist USING INTEGER PRIMARY KEY (rowid=?)',
+                      'SEARCH Venue USING INTEGER PRIMARY KEY (rowid=?)']),
+}
+
+
+def plan(stmt):
+    sql = str(stmt.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+@pytest.mark.parametrize('name', sorted(PLANS))
+def test_query_uses_its_index(catalog, name):
+    build, expected, *sorts = PLANS[name]
+    with catalog('small').app_context():
+        steps = plan(build())
+    for step in expected:
+        assert any(line.startswith(step) for line in steps), steps
+    if not sorts:
+        assert not any('TEMP B-TREE' in line for line in steps), steps
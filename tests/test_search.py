@@ -0,0 +1,30 @@
+from cache import response_cache
+from models import db, Venue
+from search import search
+
+
+def rename_elsewhere(app, venue_id, name):
+    # another process's edit: all that reaches this one is the write and
+    # the tag bump in the shared cache.
+    with app.test_request_context():
+        db.session.get(Venue, venue_id).name = name
+        db.session.commit()
+        response_cache.invalidate('venues', 'venue:%s' % venue_id)
+
+
+def found(app, term):
+    with app.test_request_context():
+        return [row['name'] for row in search(Venue, term)['data']]
+
+
+def test_ngram_index_follows_other_workers_writes(workers, share):
+    a, b = share(*workers(2))
+    assert found(b, 'Zyzzyva') == []
+
+    rename_elsewhere(a, 1, 'Zyzzyva Hall')
+    assert found(b, 'Zyzzyva') == ['Zyzzyva Hall']
+
+
+def test_ngram_indexes_are_per_app(workers):
+    a, b = workers(2)
+    assert a.extensions['search'].indexes[Venue] is not b.extensions['search'].indexes[Venue]
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from models import db, Show, ShowStats
+import show_stats
+
+
+def expected_stats(now):
+    # what every row should hold at `now`, straight from the Show table.
+    stats = {}
+    for venue_id, artist_id, start_time in db.session.execute(
+            select(Show.venue_id, Show.artist_id, Show.start_time)):
+        for key in (('venue', venue_id), ('artist', artist_id)):
+            upcoming, next_show_at = stats.get(key, (0, None))
+            if start_time > now:
+                upcoming += 1
+                next_show_at = min(next_show_at or start_time, start_time)
+            stats[key] = (upcoming, next_show_at)
+    return stats
+
+
+def test_roll_moves_started_shows_and_invalidates_both_listings(workers, share):
+    app, = share(*workers(1))
+    client = app.test_client()
+    with app.app_context():
+        # stats as of two days ago: the shows since then are still upcoming.
+        since = datetime.now() - timedelta(days=2)
+        show_stats.rebuild(since)
+        db.session.commit()
+        started = {key for key, (upcoming, next_show_at) in expected_stats(since).items()
+                   if next_show_at is not None and next_show_at <= datetime.now()}
+    assert started
+    before = {url: client.get(url).headers['ETag'] for url in ('/api/v1/venues', '/api/v1/artists')}
+
+    result = app.test_cli_runner().invoke(args=['show-stats', 'roll'])
+    assert result.output == 'Rolled {} venues/artists.\n'.format(len(started))
+
+    with app.app_context():
+        stats = {(row.entity_type, row.entity_id): (row.upcoming_count, row.next_show_at)
+                 for row in db.session.execute(select(ShowStats)).scalars()}
+        assert stats == expected_stats(datetime.now())
+    for url, etag in before.items():
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
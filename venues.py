@@ -0,0 +1,244 @@
+import traceback
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+
+from forms import VenueForm
+from models import db, Venue, genres_by_name
+from queries import (venue_areas_query, group_areas, in_genre, venue_detail, venues_near,
+                     calendar_query, VENUE_ORDER)
+from pagination import paginate
+from search import search
+from cache import response_cache
+from routing import read_only
+from invalidation import venue_changed
+import show_stats
+import geo
+import ical
+import ratelimit
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+venues = Blueprint('venues', __name__)
+
+
+@venues.route('/venues')
+@read_only
+@response_cache.cached('venues')
+def index():
+    # one query: venues joined to their show_stats counts, ordered by
+    # state/city so areas can be built in a single pass.
+    rows, next_cursor = paginate(venue_areas_query(), VENUE_ORDER)
+
+    return render_template('pages/venues.html', areas=group_areas(rows), next_cursor=next_cursor)
+
+
+@venues.route('/venues/genres/<genre>')
+@read_only
+@response_cache.cached('venues')
+def venues_by_genre(genre):
+    stmt = in_genre(venue_areas_query(), Venue, genre)
+    rows, next_cursor = paginate(stmt, VENUE_ORDER)
+
+    return render_template('pages/venues.html', areas=group_areas(rows), next_cursor=next_cursor, genre=genre)
+
+
+@venues.route('/venues/search', methods=['POST'])
+@read_only
+@ratelimit.limit('search')
+def search_venues():
+    # TODO: implement search on venues with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+
+    search_term = request.form.get('search_term', '')
+    response = search(Venue, search_term)
+
+    return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+
+@venues.route('/venues/nearby')
+@read_only
+def nearby_venues():
+    # ?lat=&lon=&radius=&limit=; without a point, just the form.
+    if 'lat' not in request.args and 'lon' not in request.args:
+        return render_template('pages/nearby_venues.html', results=None, radius=geo.DEFAULT_RADIUS_KM)
+    latitude, longitude, radius, limit = geo.nearby_args()
+    results = venues_near(latitude, longitude, radius, limit)
+    return render_template('pages/nearby_venues.html', results=results, latitude=latitude,
+                           longitude=longitude, radius=radius)
+
+
+@venues.route('/venues/<int:venue_id>')
+@read_only
+@response_cache.cached('venue:{venue_id}')
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    # TODO: replace with real venue data from the venues table, using venue_id
+    data, next_show_at = venue_detail(venue_id, datetime.now())
+    if data is None:
+        abort(404)
+    response_cache.expire_at(next_show_at)
+
+    # data = list(filter(lambda d: d['id'] ==
+    #                    venue_id, [data]))[0]
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@venues.route('/venues/<int:venue_id>/calendar.ics')
+@read_only
+@response_cache.conditional('venue:{venue_id}')
+@response_cache.cached('venue:{venue_id}')
+def venue_calendar(venue_id):
+    # subscribed feeds are polled. With a shared cache a poll that
+    # revalidates gets a 304 straight from the tag versions and only a
+    # changed feed is rebuilt; in process, feeds aren't kept (keep_for).
+    venue = db.session.get(Venue, venue_id)
+    if venue is None:
+        abort(404)
+    since = datetime.now() - timedelta(days=current_app.config['CALENDAR_PAST_DAYS'])
+    rows = db.session.execute(calendar_query(Venue, venue_id, since)).all()
+    response_cache.keep_for(current_app.config['CALENDAR_CACHE_TTL'])
+    return ical.feed(venue.name, rows)
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@venues.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@venues.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+
+    form = VenueForm(request.form)
+
+    try:
+        venue = Venue(
+            name=form.name.data,
+            city=form.city.data,
+            state=form.state.data,
+            address=form.address.data,
+            phone=form.phone.data,
+            genres=genres_by_name(form.genres.data),
+            facebook_link=form.facebook_link.data,
+            image_link=form.image_link.data,
+            website_link=form.website_link.data,
+            looking_for_talent=form.seeking_talent.data,
+            seeking_description=form.seeking_description.data
+        )
+
+        db.session.add(venue)
+        db.session.commit()
+        venue_changed(venue.id)
+    # on successful db insert, flash success
+        flash('Venue ' + request.form['name'] + ' was successfully listed!')
+
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    except:
+        db.session.rollback()
+        flash('An error occured. Venue ' +
+              request.form['name'] + ' could not be listed.')
+    finally:
+        db.session.close()
+
+    # return render_template('pages/home.html')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html', form=form)
+
+
+@venues.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    # TODO: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    try:
+        venue = Venue.query.get(venue_id)
+        db.session.delete(venue)
+        show_stats.refresh('venue', [int(venue_id)], datetime.now())
+        db.session.commit()
+        venue_changed(venue_id)
+    except:
+        db.session.rollback()
+        traceback.print_exc()
+    finally:
+        db.session.close()
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    return None
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    form = VenueForm()
+
+    venues = Venue.query.filter_by(id=venue_id).all()
+
+    for venue in venues:
+        venue = {
+            "id": venue.id,
+            "name": venue.name,
+            "genres": [genre.name for genre in venue.genres],
+            "address": venue.address,
+            "city": venue.city,
+            "state": venue.state,
+            "phone": venue.phone,
+            "website": venue.website_link,
+            "facebook_link": venue.facebook_link,
+            "seeking_talent": venue.looking_for_talent,
+            "seeking_description": venue.seeking_description,
+            "image_link": venue.image_link
+        }
+
+    # TODO: populate form with values from venue with ID <venue_id>
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    # TODO: take values from the form submitted, and update existing
+    # venue record with ID <venue_id> using the new attributes
+
+    form = VenueForm(request.form)
+
+    try:
+        venue = Venue.query.filter_by(id=venue_id).first()
+
+        if (venue.address, venue.city, venue.state) != (form.address.data, form.city.data, form.state.data):
+            # moved: the next `flask geocode` locates it again.
+            venue.latitude = venue.longitude = venue.geohash = None
+        venue.name = form.name.data
+        venue.city = form.city.data
+        venue.state = form.state.data
+        venue.address = form.address.data
+        venue.phone = form.phone.data
+        venue.genres = genres_by_name(form.genres.data)
+        venue.facebook_link = form.facebook_link.data
+        venue.image_link = form.image_link.data
+        venue.website_link = form.website_link.data
+        venue.looking_for_talent = form.seeking_talent.data
+        venue.seeking_description = form.seeking_description.data
+
+        db.session.commit()
+        venue_changed(venue_id)
+
+    except Exception:
+        db.session.rollback()
+        flash('An error occured. Could not be updated.')
+
+    finally:
+        db.session.close()
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))